@@ -3,32 +3,554 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import orjson
+import zstandard as zstd
+from rattler import Platform, Version
+from rattler.exceptions import InvalidVersionError
 from rattler.index import index_fs
 
+# Default directory for the per-channel manifests holding the fingerprints
+# of each subdir as of the last successful index run
+DEFAULT_INDEX_CACHE_DIR = Path.home() / ".cache" / "cart-wheel" / "index"
 
-def index_channel(channel_dir: Path) -> None:
+# Index of the sharded repodata written into each subdir
+SHARDS_INDEX_FILENAME = "repodata_shards.msgpack.zst"
+
+# SQLite index of package files, kept in the state directory for pruning
+PACKAGE_DB_FILENAME = "packages.sqlite"
+
+# Files beyond the newest keep_versions versions of each package
+_PRUNE_QUERY = """
+SELECT subdir, filename FROM (
+    SELECT subdir, filename, DENSE_RANK() OVER (
+        PARTITION BY subdir, name
+        ORDER BY version COLLATE conda_version DESC
+    ) AS version_rank
+    FROM packages
+)
+WHERE version_rank > ?
+"""
+
+# File extensions of conda package archives
+_PACKAGE_SUFFIXES = (".conda", ".tar.bz2")
+
+# Default zstd level for repodata.json.zst
+DEFAULT_COMPRESSION_LEVEL = 19
+
+# Repodata compressed with a trained dictionary, written next to the
+# standard repodata.json.zst for clients configured with that dictionary
+REPODATA_DICT_FILENAME = "repodata.json.dict.zst"
+
+# Window size (log2) for repodata.json.zst, the default decoder limit
+_REPODATA_WINDOW_LOG = 27
+
+# Default size of a trained repodata compression dictionary
+DEFAULT_DICT_SIZE = 64 * 1024
+
+# Maximum number of subdirs indexed at the same time
+_MAX_CONCURRENT_SUBDIRS = min(8, os.cpu_count() or 1)
+
+# Maximum number of files removed at the same time when pruning
+_MAX_CONCURRENT_UNLINKS = 16
+
+# Event loop reused by successive index_channel calls on the same thread
+_thread_state = threading.local()
+
+
+def index_channel(
+    channel_dir: Path,
+    *,
+    write_shards: bool = False,
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+    zstd_dict: bytes | None = None,
+    cache_dir: Path | None = None,
+    fresh_loop: bool = False,
+) -> None:
     """Generate repodata.json for each subdir in the channel.
 
     Uses py-rattler's index_fs to generate proper repodata.json files
     with support for sharded repodata and compression.
 
+    With write_shards, each subdir additionally gets sharded repodata
+    (CEP-16): a ``repodata_shards.msgpack.zst`` index mapping package names
+    to content-addressed ``shards/<sha256>.msgpack.zst`` files, so clients
+    only download the shards of packages that changed. Shards that the
+    new index no longer references are removed.
+
+    With cache_dir, subdirs whose package files are unchanged since the
+    previous run are skipped. Their fingerprints are kept in a manifest in
+    cache_dir (e.g. DEFAULT_INDEX_CACHE_DIR), outside the published
+    channel, together with the compression level and dictionary digest:
+    changing either recompresses every subdir. Without cache_dir, every
+    subdir is handed to index_fs again and recompressed.
+
+    repodata.json.zst is written by us rather than by index_fs, using a
+    high compression level and long-range matching: repodata is written
+    once and downloaded by every client, so the extra CPU pays off.
+
+    When zstd_dict is given, each subdir additionally gets
+    ``repodata.json.dict.zst``, compressed with that dictionary (see
+    train_repodata_dictionary). Only clients configured with the same
+    dictionary can read it, so the standard repodata.json.zst is always
+    written without one.
+
+    Runs on uvloop when it is installed (the ``uvloop`` extra). The event
+    loop is created once per thread, reused by later calls and closed when
+    the thread exits, so indexing many channels in a row does not pay for
+    loop setup and teardown each time. Pass fresh_loop to run on a new loop
+    that is closed afterwards, e.g. for one-off calls or in forked worker
+    processes. From code that already runs an event loop, await
+    aindex_channel instead.
+
     Args:
         channel_dir: Root directory of the conda channel
+        write_shards: Whether to write sharded repodata
+        compression_level: Zstandard level for repodata.json.zst (1-22)
+        zstd_dict: Trained zstd dictionary for compressing repodata.json
+        cache_dir: Directory to keep the index manifest in
+        fresh_loop: Whether to run on a new event loop instead of the
+            thread's cached one
+
+    Raises:
+        RuntimeError: If called while an event loop is running
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError(
+            "index_channel() cannot be called from a running event loop, "
+            "await aindex_channel() instead"
+        )
+
+    coro = aindex_channel(
+        channel_dir,
+        write_shards=write_shards,
+        compression_level=compression_level,
+        zstd_dict=zstd_dict,
+        cache_dir=cache_dir,
+    )
+    if not fresh_loop:
+        _get_loop().run_until_complete(coro)
+        return
+
+    loop = _new_loop()
+    try:
+        loop.run_until_complete(coro)
+    finally:
+        _close_loop(loop)
+
+
+class _CachedLoop:
+    """A thread's reusable event loop, closed once the thread is gone.
+
+    The finalizer runs when the thread-local holding this object is
+    cleared, or at interpreter exit for threads that are still alive. It
+    does not wait for the default executor, as that needs a new thread,
+    which cannot be started at interpreter exit.
+    """
+
+    def __init__(self) -> None:
+        self.loop = _new_loop()
+        self.finalizer = weakref.finalize(
+            self, _close_loop, self.loop, wait_for_executor=False
+        )
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the current thread's reusable event loop, creating it if needed.
+
+    Returns:
+        An open event loop, from uvloop when it is installed
     """
-    asyncio.run(_index_channel_async(channel_dir))
+    cached = getattr(_thread_state, "cached", None)
+    if cached is None or cached.loop.is_closed():
+        cached = _CachedLoop()
+        _thread_state.cached = cached
+    return cached.loop
+
+
+def _new_loop() -> asyncio.AbstractEventLoop:
+    """Create an event loop, from uvloop when it is installed."""
+    try:
+        import uvloop
+
+        return uvloop.new_event_loop()
+    except ImportError:
+        return asyncio.new_event_loop()
+
+
+def _close_loop(
+    loop: asyncio.AbstractEventLoop, *, wait_for_executor: bool = True
+) -> None:
+    """Shut down a loop's async generators and default executor, then close it.
+
+    Without wait_for_executor, close() alone stops the default executor's
+    threads, without waiting for them and without starting a helper thread.
+    """
+    if loop.is_closed():
+        return
+    try:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        if wait_for_executor:
+            loop.run_until_complete(loop.shutdown_default_executor())
+    finally:
+        loop.close()
+
+
+def index_channels(
+    channel_dirs: list[Path],
+    *,
+    write_shards: bool = False,
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+    zstd_dict: bytes | None = None,
+    cache_dir: Path | None = None,
+    max_workers: int | None = None,
+) -> None:
+    """Generate repodata.json for several channels in parallel.
+
+    Each channel is indexed on its own worker thread with a fresh event
+    loop, as the worker threads do not outlive this call. py-rattler
+    releases the GIL while indexing, so the channels are processed in
+    parallel.
+
+    Args:
+        channel_dirs: Root directories of the conda channels
+        write_shards: Whether to write sharded repodata
+        compression_level: Zstandard level for repodata.json.zst (1-22)
+        zstd_dict: Trained zstd dictionary for compressing repodata.json
+        cache_dir: Directory to keep the index manifests in
+        max_workers: Maximum number of channels indexed at once
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                index_channel,
+                channel_dir,
+                write_shards=write_shards,
+                compression_level=compression_level,
+                zstd_dict=zstd_dict,
+                cache_dir=cache_dir,
+                fresh_loop=True,
+            )
+            for channel_dir in channel_dirs
+        ]
+        for future in futures:
+            future.result()
+
+
+async def aindex_channel(
+    channel_dir: Path,
+    *,
+    write_shards: bool = False,
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+    zstd_dict: bytes | None = None,
+    cache_dir: Path | None = None,
+) -> None:
+    """Generate repodata.json for each subdir in the channel asynchronously.
+
+    Async counterpart of index_channel for callers that already run an
+    event loop.
+
+    Args:
+        channel_dir: Root directory of the conda channel
+        write_shards: Whether to write sharded repodata
+        compression_level: Zstandard level for repodata.json.zst (1-22)
+        zstd_dict: Trained zstd dictionary for compressing repodata.json
+        cache_dir: Directory to keep the index manifest in
+    """
+    # Every channel has a noarch subdir, even before it holds any packages
+    (channel_dir / "noarch").mkdir(exist_ok=True)
+
+    manifest_path = _manifest_path(channel_dir, cache_dir) if cache_dir else None
+    manifest = _load_manifest(manifest_path) if manifest_path else {}
+    known_fingerprints = manifest.get("subdirs", {})
+
+    # Settings that shape the compressed repodata; any change recompresses all
+    compression = {
+        "level": compression_level,
+        "dict": hashlib.sha256(zstd_dict).hexdigest() if zstd_dict else None,
+    }
+    recompress_all = manifest.get("compression") != compression
+
+    fingerprints = {
+        subdir: _fingerprint_subdir(channel_dir / subdir)
+        for subdir in _list_subdirs(channel_dir)
+    }
+    changed = [
+        subdir
+        for subdir, fingerprint in fingerprints.items()
+        if known_fingerprints.get(subdir) != fingerprint
+        or not (channel_dir / subdir / "repodata.json").exists()
+        or (
+            write_shards
+            and not (channel_dir / subdir / SHARDS_INDEX_FILENAME).exists()
+        )
+    ]
+
+    # Subdirs are independent, so index them concurrently
+    semaphore = asyncio.Semaphore(_MAX_CONCURRENT_SUBDIRS)
+
+    async def index_bounded(subdir: str) -> None:
+        async with semaphore:
+            await index_fs(
+                channel_directory=channel_dir,
+                target_platform=Platform(subdir),
+                write_zst=False,  # Compressed below with our own settings
+                write_shards=write_shards,
+                force=False,  # Only re-index if needed
+            )
+            if write_shards:
+                await asyncio.to_thread(_remove_stale_shards, channel_dir / subdir)
+
+    await asyncio.gather(*(index_bounded(subdir) for subdir in changed))
+
+    async def compress_bounded(subdir: str) -> None:
+        async with semaphore:
+            await asyncio.to_thread(
+                _compress_repodata,
+                channel_dir / subdir,
+                compression_level,
+                zstd_dict,
+            )
+
+    await asyncio.gather(
+        *(
+            compress_bounded(subdir)
+            for subdir in _list_subdirs(channel_dir)
+            if recompress_all
+            or _needs_compression(channel_dir / subdir, zstd_dict is not None)
+        )
+    )
+
+    if manifest_path:
+        _save_manifest(
+            manifest_path, {"compression": compression, "subdirs": fingerprints}
+        )
+
+
+def _needs_compression(subdir_path: Path, with_dict: bool) -> bool:
+    """Check whether a subdir's compressed repodata is missing or outdated."""
+    try:
+        repodata_mtime = (subdir_path / "repodata.json").stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+    names = ["repodata.json.zst"]
+    if with_dict:
+        names.append(REPODATA_DICT_FILENAME)
+    for name in names:
+        try:
+            zst_mtime = (subdir_path / name).stat().st_mtime_ns
+        except FileNotFoundError:
+            return True
+        if zst_mtime < repodata_mtime:
+            return True
+    return False
+
+
+def _remove_stale_shards(subdir_path: Path) -> None:
+    """Delete shard files that the subdir's shard index no longer references.
+
+    The index stores each shard's SHA-256 as 32 raw bytes, so a shard is
+    referenced exactly when its digest occurs in the decompressed index.
+    """
+    shards_dir = subdir_path / "shards"
+    if not shards_dir.is_dir():
+        return
+
+    with open(subdir_path / SHARDS_INDEX_FILENAME, "rb") as f:
+        index = zstd.ZstdDecompressor().stream_reader(f).read()
 
+    for shard_path in shards_dir.glob("*.msgpack.zst"):
+        digest = shard_path.name.removesuffix(".msgpack.zst")
+        try:
+            referenced = bytes.fromhex(digest) in index
+        except ValueError:
+            continue  # Not a shard written by index_fs
+        if not referenced:
+            shard_path.unlink(missing_ok=True)
 
-async def _index_channel_async(channel_dir: Path) -> None:
-    """Async implementation of channel indexing."""
-    await index_fs(
-        channel_directory=channel_dir,
-        target_platform=None,  # Index all platforms
-        write_zst=True,  # Generate compressed repodata
-        write_shards=False,  # Skip sharded repodata for simplicity
-        force=False,  # Only re-index if needed
+
+def _compress_repodata(
+    subdir_path: Path,
+    compression_level: int,
+    zstd_dict: bytes | None,
+) -> None:
+    """Write repodata.json.zst for a subdir from its repodata.json.
+
+    With zstd_dict, repodata.json.dict.zst is written as well; without it,
+    a dictionary-compressed file left by an earlier run is removed.
+
+    index_fs already writes packages sorted by filename, which keeps
+    similar records next to each other for the compressor, so the JSON
+    is compressed as-is.
+    """
+    repodata_path = subdir_path / "repodata.json"
+
+    # Long-range matching finds repeats across the whole file, and worker
+    # threads compress blocks of large repodata files in parallel
+    params = zstd.ZstdCompressionParameters.from_level(
+        compression_level,
+        window_log=_REPODATA_WINDOW_LOG,
+        enable_ldm=True,
+        threads=-1,
     )
+    _write_compressed(
+        repodata_path,
+        subdir_path / "repodata.json.zst",
+        zstd.ZstdCompressor(compression_params=params),
+    )
+
+    dict_path = subdir_path / REPODATA_DICT_FILENAME
+    if zstd_dict:
+        _write_compressed(
+            repodata_path,
+            dict_path,
+            zstd.ZstdCompressor(
+                compression_params=params,
+                dict_data=zstd.ZstdCompressionDict(zstd_dict),
+            ),
+        )
+    else:
+        dict_path.unlink(missing_ok=True)
+
+
+def _write_compressed(
+    source_path: Path, zst_path: Path, cctx: zstd.ZstdCompressor
+) -> None:
+    """Compress a file into zst_path atomically."""
+    temp_path = zst_path.with_suffix(".zst.tmp")
+    with open(source_path, "rb") as src, open(temp_path, "wb") as dst:
+        cctx.copy_stream(src, dst, size=source_path.stat().st_size)
+    temp_path.replace(zst_path)
+
+
+def train_repodata_dictionary(
+    channel_dir: Path,
+    dict_size: int = DEFAULT_DICT_SIZE,
+) -> bytes:
+    """Train a zstd dictionary on the repodata of an indexed channel.
+
+    Every package record in each subdir's repodata.json is used as a
+    sample, so the dictionary captures the keys and values that repeat
+    across records.
+
+    Args:
+        channel_dir: Root directory of an indexed conda channel
+        dict_size: Maximum size of the dictionary in bytes
+
+    Returns:
+        The trained dictionary
+
+    Raises:
+        zstandard.ZstdError: If there are too few records to train on
+    """
+    samples = []
+    for subdir in _list_subdirs(channel_dir):
+        repodata_path = channel_dir / subdir / "repodata.json"
+        if not repodata_path.exists():
+            continue
+
+        repodata = _load_repodata(repodata_path)
+        for key in ("packages", "packages.conda"):
+            for filename, record in repodata.get(key, {}).items():
+                samples.append(orjson.dumps({filename: record}))
+
+    return zstd.train_dictionary(dict_size, samples).as_bytes()
+
+
+def _load_repodata(repodata_path: Path) -> dict:
+    """Parse a repodata.json file directly from a memory map.
+
+    Repodata can be tens of megabytes, so this avoids copying the file
+    into a Python bytes object before parsing it.
+    """
+    with open(repodata_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return orjson.loads(view)
+
+
+def _list_subdirs(channel_dir: Path) -> list[str]:
+    """List the platform subdirs present in the channel."""
+    platforms = {str(p) for p in Platform.all()}
+    with os.scandir(channel_dir) as entries:
+        return sorted(
+            entry.name
+            for entry in entries
+            if entry.name in platforms and entry.is_dir()
+        )
+
+
+def _scan_packages(subdir_path: Path) -> dict[str, int]:
+    """Map the filename of every package file in a subdir to its size."""
+    with os.scandir(subdir_path) as entries:
+        return {
+            entry.name: entry.stat().st_size
+            for entry in entries
+            if entry.name.endswith(_PACKAGE_SUFFIXES) and entry.is_file()
+        }
+
+
+def _fingerprint_subdir(subdir_path: Path) -> str:
+    """Hash the name and size of every package file in a subdir."""
+    return _fingerprint_packages(_scan_packages(subdir_path))
+
+
+def _fingerprint_packages(packages: dict[str, int]) -> str:
+    """Hash a mapping of package filenames to sizes.
+
+    Modification times are left out on purpose: package files are
+    immutable once published, and mirrors often touch files without
+    changing them, which should not trigger a re-index.
+    """
+    records = sorted(f"{name}\0{size}" for name, size in packages.items())
+    # Internal fingerprint only, so use the faster BLAKE2 over SHA-256
+    return hashlib.blake2b("\n".join(records).encode(), digest_size=32).hexdigest()
+
+
+def _manifest_path(channel_dir: Path, cache_dir: Path) -> Path:
+    """Locate the manifest of a channel in the cache directory.
+
+    Named after the resolved channel path, so several channels can share
+    one cache directory.
+    """
+    key = str(channel_dir.resolve()).encode()
+    digest = hashlib.blake2b(key, digest_size=16).hexdigest()
+    return cache_dir / f"{digest}.json"
+
+
+def _load_manifest(manifest_path: Path) -> dict:
+    """Load the compression settings and subdir fingerprints of the last run."""
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_manifest(manifest_path: Path, manifest: dict) -> None:
+    """Save the compression settings and subdir fingerprints atomically."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = manifest_path.with_suffix(".json.tmp")
+
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    temp_path.replace(manifest_path)
 
 
 def prune_channel(
@@ -38,6 +560,17 @@ def prune_channel(
 ) -> list[Path]:
     """Remove old versions from channel.
 
+    Package files are tracked in a SQLite database in the state directory.
+    Only subdirs whose files changed since the previous prune are re-scanned,
+    and the files to remove are selected with a single ranked query. All
+    builds of the newest keep_versions versions of each package are kept.
+    Files whose version cannot be parsed are never tracked, so they are
+    left in place.
+
+    The database is committed before any file is removed. If removal fails
+    partway, the leftover files no longer match the recorded fingerprint
+    and are picked up again by the next prune.
+
     Args:
         channel_dir: Root directory of the conda channel
         state_dir: Directory containing state files
@@ -46,10 +579,146 @@ def prune_channel(
     Returns:
         List of removed file paths
     """
-    # This is a placeholder - full implementation would need to:
-    # 1. Group packages by name
-    # 2. Sort by version
-    # 3. Remove all but keep_versions newest
-    # 4. Update state files
-    # For now, return empty list
-    return []
+    state_dir.mkdir(parents=True, exist_ok=True)
+    conn = _open_package_db(state_dir / PACKAGE_DB_FILENAME)
+
+    try:
+        with conn:
+            _update_package_db(conn, channel_dir)
+
+            rows = conn.execute(_PRUNE_QUERY, (keep_versions,)).fetchall()
+            conn.executemany(
+                "DELETE FROM packages WHERE subdir = ? AND filename = ?", rows
+            )
+
+            # Record each subdir as it will be once the files are removed
+            removed_by_subdir: dict[str, set[str]] = {}
+            for subdir, filename in rows:
+                removed_by_subdir.setdefault(subdir, set()).add(filename)
+            for subdir, filenames in removed_by_subdir.items():
+                remaining = _scan_packages(channel_dir / subdir)
+                for filename in filenames:
+                    remaining.pop(filename, None)
+                conn.execute(
+                    "UPDATE subdirs SET fingerprint = ? WHERE subdir = ?",
+                    (_fingerprint_packages(remaining), subdir),
+                )
+
+        removed = [channel_dir / subdir / filename for subdir, filename in rows]
+        if removed:
+            # Overlap the unlink syscalls, which dominate on large channels
+            with ThreadPoolExecutor(max_workers=_MAX_CONCURRENT_UNLINKS) as executor:
+                futures = [
+                    executor.submit(path.unlink, missing_ok=True) for path in removed
+                ]
+                for future in futures:
+                    future.result()
+    finally:
+        conn.close()
+        # Bound memory when pruning many channels in one process
+        _parse_package_filename.cache_clear()
+        _parse_version.cache_clear()
+
+    return removed
+
+
+def _open_package_db(db_path: Path) -> sqlite3.Connection:
+    """Open the package database, creating the schema if needed."""
+    conn = sqlite3.connect(db_path)
+    conn.create_collation("conda_version", _compare_versions)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS packages (
+            subdir TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            name TEXT NOT NULL,
+            version TEXT NOT NULL,
+            build TEXT NOT NULL,
+            PRIMARY KEY (subdir, filename)
+        );
+        CREATE TABLE IF NOT EXISTS subdirs (
+            subdir TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL
+        );
+        """
+    )
+    return conn
+
+
+def _update_package_db(conn: sqlite3.Connection, channel_dir: Path) -> None:
+    """Bring the package database in line with the files in the channel."""
+    known = dict(conn.execute("SELECT subdir, fingerprint FROM subdirs"))
+    subdirs = _list_subdirs(channel_dir)
+
+    for subdir in known.keys() - set(subdirs):
+        conn.execute("DELETE FROM packages WHERE subdir = ?", (subdir,))
+        conn.execute("DELETE FROM subdirs WHERE subdir = ?", (subdir,))
+
+    for subdir in subdirs:
+        on_disk = _scan_packages(channel_dir / subdir)
+        fingerprint = _fingerprint_packages(on_disk)
+        if known.get(subdir) == fingerprint:
+            continue
+
+        in_db = {
+            filename
+            for (filename,) in conn.execute(
+                "SELECT filename FROM packages WHERE subdir = ?", (subdir,)
+            )
+        }
+        parsed = {
+            filename: record
+            for filename in on_disk
+            if (record := _parse_package_filename(filename)) is not None
+        }
+
+        conn.executemany(
+            "DELETE FROM packages WHERE subdir = ? AND filename = ?",
+            [(subdir, filename) for filename in in_db - parsed.keys()],
+        )
+        conn.executemany(
+            "INSERT INTO packages (subdir, filename, name, version, build) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (subdir, filename, *parsed[filename])
+                for filename in parsed.keys() - in_db
+            ],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO subdirs (subdir, fingerprint) VALUES (?, ?)",
+            (subdir, fingerprint),
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_package_filename(filename: str) -> tuple[str, str, str] | None:
+    """Split a package filename into (name, version, build).
+
+    Returns None for filenames that are not package files or whose version
+    rattler cannot parse, as the version collation could not rank them.
+    """
+    for suffix in _PACKAGE_SUFFIXES:
+        if filename.endswith(suffix):
+            parts = filename[: -len(suffix)].rsplit("-", 2)
+            if len(parts) == 3:
+                try:
+                    _parse_version(parts[1])
+                except InvalidVersionError:
+                    return None
+                return parts[0], parts[1], parts[2]
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_version(version: str) -> Version:
+    """Parse a conda version string.
+
+    Cached because the sort collation compares each version many times.
+    """
+    return Version(version)
+
+
+def _compare_versions(a: str, b: str) -> int:
+    """Compare two conda version strings for the SQLite collation."""
+    version_a, version_b = _parse_version(a), _parse_version(b)
+    return (version_a > version_b) - (version_a < version_b)
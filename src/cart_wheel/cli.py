@@ -3,38 +3,40 @@
 from __future__ import annotations
 
 import argparse
-import asyncio
+import contextlib
+import functools
 import sys
-import time
 from dataclasses import dataclass, field
-from datetime import UTC, datetime
+from itertools import islice
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, TypeVar
 
+import orjson
 from rich.console import Console
 from rich.live import Live
-from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.prompt import Prompt
 from rich.table import Table
+from rich.text import Text
 
-from .channel import index_channel
-from .conda import DependencyConversionError, convert_wheel
-from .pypi import PyPIError, download_wheel, get_matching_versions, select_best_wheel
 from .state import (
+    DEFAULT_STATUS_CACHE_DIR,
     Dependencies,
     WheelState,
     list_packages,
-    load_state,
+    load_status_counts,
     save_state,
     validate_all_dependencies,
 )
-from .sync import check_for_updates, sync_all, sync_package
 
 if TYPE_CHECKING:
+    from collections.abc import Collection, Coroutine
+
     from hishel.httpx import AsyncCacheClient
 
 console = Console()
 
+_T = TypeVar("_T")
+
 # Default paths (relative to CWD)
 DEFAULT_PACKAGES_DIR = Path("packages")
 DEFAULT_STATE_DIR = Path("state")
@@ -43,49 +45,35 @@ DEFAULT_OUTPUT_DIR = Path("output")
 # Conda mapping API
 CONDA_MAPPING_URL = "https://conda-mapping.prefix.dev/pypi-to-conda-v1/conda-forge"
 
+# Filename suffixes of pure Python wheels
+_PURE_SUFFIXES = ("-py3-none-any.whl", "-py2.py3-none-any.whl")
 
-def lookup_conda_mapping(pypi_name: str) -> str | None:
-    """Look up the conda-forge package name for a PyPI package.
+# Maximum number of concurrent requests when fetching package info
+_MAX_CONCURRENT_REQUESTS = 50
 
-    Uses the prefix.dev mapping API to find the corresponding conda package.
+# Seconds between progress table rebuilds while adding packages
+_DISPLAY_REFRESH_INTERVAL = 0.25
 
-    Args:
-        pypi_name: PyPI package name (normalized)
+# Status prefixes of the per-package lines printed while adding packages
+_OK_PREFIX = Text("✓ ", style="green")
+_NEEDS_INPUT_PREFIX = Text("? ", style="yellow")
 
-    Returns:
-        Conda-forge package name if found, None otherwise
-    """
-    from .http import get_cached_client
 
-    normalized = pypi_name.lower().replace("_", "-")
-    url = f"{CONDA_MAPPING_URL}/{normalized}.json"
+def _run_async(coro: Coroutine[Any, Any, _T]) -> _T:
+    """Run a coroutine on a new event loop, using uvloop when it is installed."""
+    import asyncio
 
     try:
-        client = get_cached_client()
-        response = client.get(url)
-
-        if response.status_code == 404:
-            return None
-
-        if response.status_code != 200:
-            return None
-
-        data = response.json()
-        conda_versions = data.get("conda_versions", {})
-
-        # Get any conda package name from the versions
-        for version_packages in conda_versions.values():
-            if version_packages:
-                return version_packages[0]
-
-        return None
-    except Exception:
-        # Silently fail - we'll fall back to prompting the user
-        return None
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+    return uvloop.run(coro)
 
 
 def cmd_convert(args: argparse.Namespace) -> int:
     """Convert a wheel to conda package."""
+    from .conda import convert_wheel
+
     wheel_path: Path = args.wheel
     output_dir: Path = args.output_dir
 
@@ -123,7 +111,7 @@ def cmd_convert(args: argparse.Namespace) -> int:
 
 def cmd_sync(args: argparse.Namespace) -> int:
     """Sync all packages."""
-    from .sync import sync_all_async
+    from .sync import sync_all, sync_all_async
 
     packages_dir = args.packages_dir
     state_dir = args.state_dir
@@ -149,7 +137,7 @@ def cmd_sync(args: argparse.Namespace) -> int:
         console.print("[bold]Syncing packages...[/]")
         console.print()
 
-        results = asyncio.run(
+        results = _run_async(
             sync_all_async(
                 packages_dir,
                 state_dir,
@@ -159,11 +147,12 @@ def cmd_sync(args: argparse.Namespace) -> int:
             )
         )
 
+    total_converted = sum(len(r.converted) for r in results)
+    total_failed = sum(len(r.failed) for r in results)
+
+    if not quiet:
         # Print summary
         console.print()
-        total_converted = sum(len(r.converted) for r in results)
-        total_failed = sum(len(r.failed) for r in results)
-
         console.print("[bold]Summary:[/]")
         if total_converted:
             console.print(f"  [green]✓[/] {total_converted} wheel(s) converted")
@@ -172,12 +161,13 @@ def cmd_sync(args: argparse.Namespace) -> int:
         if not total_converted and not total_failed:
             console.print("  [dim]No wheels to process[/]")
 
-    total_failed = sum(len(r.failed) for r in results)
     return 1 if total_failed > 0 else 0
 
 
 def cmd_sync_package(args: argparse.Namespace) -> int:
     """Sync a single package."""
+    from .sync import sync_package
+
     package = args.package
     packages_dir = args.packages_dir
     state_dir = args.state_dir
@@ -199,6 +189,8 @@ def cmd_sync_package(args: argparse.Namespace) -> int:
 
 def cmd_check(args: argparse.Namespace) -> int:
     """Check for new versions on PyPI."""
+    from .sync import check_for_updates
+
     packages_dir = args.packages_dir
     state_dir = args.state_dir
 
@@ -243,17 +235,65 @@ def cmd_validate(args: argparse.Namespace) -> int:
 
 def cmd_index(args: argparse.Namespace) -> int:
     """Generate repodata.json for the channel."""
+    from .channel import (
+        DEFAULT_COMPRESSION_LEVEL,
+        DEFAULT_INDEX_CACHE_DIR,
+        index_channel,
+    )
+
     output_dir = args.output_dir
 
     if not output_dir.exists():
         print(f"Error: Output directory not found: {output_dir}", file=sys.stderr)
         return 1
 
-    index_channel(output_dir)
+    zstd_dict = None
+    if args.zstd_dict:
+        if not args.zstd_dict.exists():
+            print(f"Error: Dictionary not found: {args.zstd_dict}", file=sys.stderr)
+            return 1
+        zstd_dict = args.zstd_dict.read_bytes()
+
+    index_channel(
+        output_dir,
+        write_shards=args.shards,
+        compression_level=(
+            DEFAULT_COMPRESSION_LEVEL
+            if args.compression_level is None
+            else args.compression_level
+        ),
+        zstd_dict=zstd_dict,
+        cache_dir=DEFAULT_INDEX_CACHE_DIR,
+        fresh_loop=True,  # One call per process, so close the loop right away
+    )
     print(f"Indexed channel: {output_dir}")
     return 0
 
 
+def cmd_train_dict(args: argparse.Namespace) -> int:
+    """Train a zstd dictionary for repodata compression."""
+    import zstandard as zstd
+
+    from .channel import DEFAULT_DICT_SIZE, train_repodata_dictionary
+
+    output_dir = args.output_dir
+    dict_path = args.dict_path or output_dir / "repodata.zdict"
+
+    if not output_dir.exists():
+        print(f"Error: Output directory not found: {output_dir}", file=sys.stderr)
+        return 1
+
+    try:
+        zstd_dict = train_repodata_dictionary(output_dir, args.size or DEFAULT_DICT_SIZE)
+    except zstd.ZstdError as e:
+        print(f"Error: Could not train dictionary: {e}", file=sys.stderr)
+        return 1
+
+    dict_path.write_bytes(zstd_dict)
+    print(f"Wrote dictionary: {dict_path} ({len(zstd_dict)} bytes)")
+    return 0
+
+
 def cmd_status(args: argparse.Namespace) -> int:
     """Show status of all packages."""
     packages_dir = args.packages_dir
@@ -269,11 +309,15 @@ def cmd_status(args: argparse.Namespace) -> int:
         print("No packages configured.")
         return 0
 
+    status_counts = load_status_counts(
+        state_dir, packages, cache_dir=DEFAULT_STATUS_CACHE_DIR
+    )
+
     for package in packages:
-        state = load_state(state_dir, package)
-        converted = sum(1 for s in state.values() if s.status == "converted")
-        failed = sum(1 for s in state.values() if s.status == "failed")
-        pending = sum(1 for s in state.values() if s.status == "pending")
+        counts = status_counts[package]
+        converted = counts.get("converted", 0)
+        failed = counts.get("failed", 0)
+        pending = counts.get("pending", 0)
 
         status_parts = []
         if converted:
@@ -289,29 +333,60 @@ def cmd_status(args: argparse.Namespace) -> int:
     return 0
 
 
-def _extract_dep_name(dep: str) -> str:
-    """Extract package name from a dependency string."""
-    from packaging.requirements import Requirement
+@functools.lru_cache(maxsize=8192)
+def _norm(name: str) -> str:
+    """Normalize a package name (lowercase, underscores to dashes)."""
+    return name.lower().replace("_", "-")
 
-    req = Requirement(dep)
-    return req.name.lower().replace("_", "-")
 
+@functools.lru_cache(maxsize=4096)
+def _parse_dep(dep: str) -> tuple[str, bool]:
+    """Parse a dependency string into its normalized name and whether it is required.
 
-def _is_required_dep(dep: str) -> bool:
-    """Check if a dependency is required (not an extra/optional dependency)."""
+    A dependency is optional when its marker restricts it to an extra.
+
+    Returns:
+        Tuple of (name, is_required)
+    """
     from packaging.requirements import Requirement
-    import re
 
     req = Requirement(dep)
-    if not req.marker:
-        return True
+    name = _norm(req.name)
+    return name, req.marker is None or not _has_extra_marker(req.marker._markers)
 
-    # Check if marker contains 'extra ==' which indicates optional dependency
-    marker_str = str(req.marker)
-    if re.search(r"extra\s*==\s*['\"]", marker_str):
-        return False
 
-    return True
+def _has_extra_marker(markers: list) -> bool:
+    """Check whether a parsed marker tree contains an ``extra == ...`` comparison."""
+    for node in markers:
+        if isinstance(node, list):
+            if _has_extra_marker(node):
+                return True
+        elif isinstance(node, tuple):
+            lhs, op, rhs = node
+            if op.serialize() == "==" and "extra" in (lhs.serialize(), rhs.serialize()):
+                return True
+    return False
+
+
+def _collect_deps(
+    deps: list[str], required_deps: set[str], optional_deps: set[str]
+) -> list[str]:
+    """Sort a wheel's dependencies into the package-wide dependency sets.
+
+    Returns:
+        The wheel's required dependency names, in requirement order.
+    """
+    wheel_required = []
+    for dep in deps:
+        dep_name, is_required = _parse_dep(dep)
+        if dep_name == "python":
+            continue
+        if is_required:
+            required_deps.add(dep_name)
+            wheel_required.append(dep_name)
+        else:
+            optional_deps.add(dep_name)
+    return wheel_required
 
 
 @dataclass
@@ -326,141 +401,19 @@ class PackageInfo:
     required_deps: set[str]
     optional_deps: set[str]
     error: str | None = None
+    # filename -> required dep names, derived while collecting the deps above
+    wheel_required_deps: dict[str, list[str]] = field(default_factory=dict)
     conda_forge: str | None = None  # Conda-forge package name if mapped
     warnings: list[str] = field(default_factory=list)  # PyPI warnings
     required_by: str | None = None  # Parent package that requires this
 
 
-def _fetch_package_info(
-    package: str,
-    constraint: str,
-    max_versions: int,
-    packages_dir: Path,
-    force: bool,
-    console: Console,
-    indent: int = 0,
-) -> PackageInfo | None:
-    """Fetch and validate package info from PyPI without writing any files.
-
-    Returns PackageInfo if successful, None if package already exists (and not force).
-    Raises exception or returns PackageInfo with error field set on failure.
-    """
-    from .pypi import fetch_wheel_metadata
-    from .wheel import parse_dependencies_from_metadata
-
-    prefix = "  " * indent
-    normalized_name = package.lower().replace("_", "-")
-
-    # Check if package already exists
-    config_path = packages_dir / f"{normalized_name}.toml"
-    if config_path.exists() and not force:
-        console.print(f"{prefix}[dim]Skipping {normalized_name} (already exists)[/]")
-        return None
-
-    console.print(f"{prefix}[bold]Checking:[/] {package}")
-
-    # Fetch from PyPI
-    try:
-        releases = list(
-            get_matching_versions(package, constraint or ">=0", max_versions=max_versions)
-        )
-    except PyPIError as e:
-        return PackageInfo(
-            name=normalized_name,
-            original_name=package,
-            constraint=constraint,
-            wheels=[],
-            wheel_dependencies={},
-            required_deps=set(),
-            optional_deps=set(),
-            error=str(e),
-        )
-
-    if not releases:
-        return PackageInfo(
-            name=normalized_name,
-            original_name=package,
-            constraint=constraint,
-            wheels=[],
-            wheel_dependencies={},
-            required_deps=set(),
-            optional_deps=set(),
-            error=f"No releases found matching constraint '{constraint or '>=0'}'",
-        )
-
-    console.print(f"{prefix}  Found [cyan]{len(releases)}[/] version(s)")
-
-    # Select pure Python wheels only
-    wheels_to_add = []
-    skipped_versions = []
-    for release in releases:
-        pure_wheel = None
-        for wheel in release.wheels:
-            if "py3-none-any" in wheel.filename or "py2.py3-none-any" in wheel.filename:
-                pure_wheel = wheel
-                break
-
-        if pure_wheel:
-            wheels_to_add.append((release, pure_wheel))
-        else:
-            skipped_versions.append(release.version)
-
-    if skipped_versions:
-        console.print(
-            f"{prefix}  [yellow]Warning:[/] Skipping {len(skipped_versions)} version(s) without pure Python wheel: "
-            f"{', '.join(skipped_versions[:3])}{'...' if len(skipped_versions) > 3 else ''}"
-        )
-
-    if not wheels_to_add:
-        return PackageInfo(
-            name=normalized_name,
-            original_name=package,
-            constraint=constraint,
-            wheels=[],
-            wheel_dependencies={},
-            required_deps=set(),
-            optional_deps=set(),
-            error="No pure Python wheels found (only platform-specific wheels available)",
-        )
-
-    # Fetch dependencies using PEP 658 metadata
-    required_deps: set[str] = set()
-    optional_deps: set[str] = set()
-    wheel_dependencies: dict[str, list[str]] = {}
-
-    for release, wheel in wheels_to_add:
-        metadata = fetch_wheel_metadata(wheel.url)
-        if metadata:
-            deps = parse_dependencies_from_metadata(metadata)
-            wheel_dependencies[wheel.filename] = deps
-            for dep in deps:
-                dep_name = _extract_dep_name(dep)
-                if dep_name != "python":
-                    if _is_required_dep(dep):
-                        required_deps.add(dep_name)
-                    else:
-                        optional_deps.add(dep_name)
-            console.print(f"{prefix}  [dim]Fetched metadata for {wheel.filename}[/]")
-        else:
-            console.print(f"{prefix}  [yellow]Warning:[/] No PEP 658 metadata for {wheel.filename}")
-
-    return PackageInfo(
-        name=normalized_name,
-        original_name=package,
-        constraint=constraint,
-        wheels=wheels_to_add,
-        wheel_dependencies=wheel_dependencies,
-        required_deps=required_deps,
-        optional_deps=optional_deps,
-    )
-
-
 async def _lookup_conda_mapping_async(
     pypi_name: str,
     client: AsyncCacheClient,
 ) -> str | None:
     """Look up conda-forge mapping asynchronously."""
-    normalized = pypi_name.lower().replace("_", "-")
+    normalized = _norm(pypi_name)
     url = f"{CONDA_MAPPING_URL}/{normalized}.json"
 
     try:
@@ -468,13 +421,9 @@ async def _lookup_conda_mapping_async(
         if response.status_code != 200:
             return None
 
-        data = response.json()
+        data = orjson.loads(response.content)
         conda_versions = data.get("conda_versions", {})
-
-        for version_packages in conda_versions.values():
-            if version_packages:
-                return version_packages[0]
-        return None
+        return next((pkgs[0] for pkgs in conda_versions.values() if pkgs), None)
     except Exception:
         return None
 
@@ -487,6 +436,8 @@ async def _fetch_package_info_async(
     required_by: str | None = None,
 ) -> PackageInfo:
     """Fetch and validate package info from PyPI asynchronously."""
+    import asyncio
+
     from .pypi import (
         PyPIError,
         fetch_wheel_metadata_async,
@@ -494,7 +445,7 @@ async def _fetch_package_info_async(
     )
     from .wheel import parse_dependencies_from_metadata
 
-    normalized_name = package.lower().replace("_", "-")
+    normalized_name = _norm(package)
 
     # Fetch from PyPI
     try:
@@ -528,13 +479,22 @@ async def _fetch_package_info_async(
             required_by=required_by,
         )
 
-    # Select pure Python wheels only
+    # Select pure Python wheels only and schedule one PEP 658 metadata fetch
+    # per URL. Selection never awaits, so the fetches only start running at
+    # the gather below, where they all proceed concurrently
     wheels_to_add = []
+    metadata_tasks: dict[str, asyncio.Task[bytes | None]] = {}
+    url_to_filenames: dict[str, list[str]] = {}
     for release in releases:
-        for wheel in release.wheels:
-            if "py3-none-any" in wheel.filename or "py2.py3-none-any" in wheel.filename:
-                wheels_to_add.append((release, wheel))
-                break
+        wheel = next((w for w in release.wheels if w.filename.endswith(_PURE_SUFFIXES)), None)
+        if wheel is None:
+            continue
+        wheels_to_add.append((release, wheel))
+        if wheel.url not in metadata_tasks:
+            metadata_tasks[wheel.url] = asyncio.create_task(
+                fetch_wheel_metadata_async(wheel.url, client)
+            )
+        url_to_filenames.setdefault(wheel.url, []).append(wheel.filename)
 
     if not wheels_to_add:
         return PackageInfo(
@@ -550,32 +510,25 @@ async def _fetch_package_info_async(
             required_by=required_by,
         )
 
-    # Fetch dependencies using PEP 658 metadata (concurrently)
+    # Collect dependencies from the fetched metadata
     required_deps: set[str] = set()
     optional_deps: set[str] = set()
     wheel_dependencies: dict[str, list[str]] = {}
+    wheel_required_deps: dict[str, list[str]] = {}
 
-    async def fetch_metadata(wheel):
-        metadata = await fetch_wheel_metadata_async(wheel.url, client)
-        return wheel.filename, metadata
-
-    metadata_tasks = [fetch_metadata(w) for _, w in wheels_to_add]
-    metadata_results = await asyncio.gather(*metadata_tasks, return_exceptions=True)
+    metadata_results = await asyncio.gather(
+        *metadata_tasks.values(), return_exceptions=True
+    )
 
-    for result in metadata_results:
-        if isinstance(result, Exception):
+    for filenames, metadata in zip(url_to_filenames.values(), metadata_results):
+        if isinstance(metadata, Exception):
             continue
-        filename, metadata = result
         if metadata:
             deps = parse_dependencies_from_metadata(metadata)
-            wheel_dependencies[filename] = deps
-            for dep in deps:
-                dep_name = _extract_dep_name(dep)
-                if dep_name != "python":
-                    if _is_required_dep(dep):
-                        required_deps.add(dep_name)
-                    else:
-                        optional_deps.add(dep_name)
+            wheel_required = _collect_deps(deps, required_deps, optional_deps)
+            for filename in filenames:
+                wheel_dependencies[filename] = deps
+                wheel_required_deps[filename] = wheel_required
 
     return PackageInfo(
         name=normalized_name,
@@ -583,6 +536,7 @@ async def _fetch_package_info_async(
         constraint=constraint,
         wheels=wheels_to_add,
         wheel_dependencies=wheel_dependencies,
+        wheel_required_deps=wheel_required_deps,
         required_deps=required_deps,
         optional_deps=optional_deps,
         warnings=pypi_warnings,
@@ -606,6 +560,8 @@ async def _fetch_single_package(
     required_by: str | None = None,
 ) -> _FetchResult:
     """Fetch conda mapping and PyPI info concurrently."""
+    import asyncio
+
     conda_task = _lookup_conda_mapping_async(package, client)
     pypi_task = _fetch_package_info_async(package, constraint, max_versions, client, required_by)
 
@@ -619,7 +575,7 @@ def _make_progress_table(
     succeeded: int,
     conda_forge: int,
     need_input: int,
-    in_flight: list[str],
+    in_flight: Collection[str],
 ) -> Table:
     """Create a progress table for Rich Live display."""
     table = Table.grid(padding=(0, 2))
@@ -627,20 +583,23 @@ def _make_progress_table(
     table.add_column()
 
     # Progress row
-    progress_text = f"Progress: {completed}/{total}"
-    stats_text = (
-        f"[green]✓ {succeeded}[/] ok  "
-        f"[cyan]⚡ {conda_forge}[/] conda-forge  "
-        f"[yellow]? {need_input}[/] need input"
+    progress_text = Text(f"Progress: {completed}/{total}")
+    stats_text = Text.assemble(
+        (f"✓ {succeeded}", "green"),
+        " ok  ",
+        (f"⚡ {conda_forge}", "cyan"),
+        " conda-forge  ",
+        (f"? {need_input}", "yellow"),
+        " need input",
     )
     table.add_row(progress_text, stats_text)
 
     # In-flight row
     if in_flight:
-        pkg_list = ", ".join(in_flight[:8])
+        pkg_list = ", ".join(islice(in_flight, 8))
         if len(in_flight) > 8:
             pkg_list += f" (+{len(in_flight) - 8} more)"
-        table.add_row("Fetching:", f"[dim]{pkg_list}[/]")
+        table.add_row(Text("Fetching:"), Text(pkg_list, style="dim"))
 
     return table
 
@@ -652,12 +611,22 @@ async def _add_packages_async(
     packages_dir: Path,
     force: bool,
     live_console: Console,
+    client: AsyncCacheClient | None = None,
+    show_progress: bool = True,
 ) -> tuple[list[PackageInfo], list[PackageInfo], bool]:
     """Fetch packages concurrently with live progress display.
 
+    All requests share one HTTP client: the given client, or a new cached
+    client that is closed when fetching completes.
+
+    Without show_progress, only the per-package lines are printed and no
+    Live progress table is drawn.
+
     Returns:
         Tuple of (packages_to_add, needs_input, aborted)
     """
+    import asyncio
+
     from .http import get_async_client
 
     packages_to_add: list[PackageInfo] = []
@@ -665,8 +634,8 @@ async def _add_packages_async(
 
     # Track state
     seen: set[str] = set()
-    existing_packages = set(list_packages(packages_dir))
-    pending: list[tuple[str, str, str | None]] = [(package, constraint, None)]
+    skip_packages = set() if force else set(list_packages(packages_dir))
+    queue: asyncio.Queue[tuple[str, str, str | None]] = asyncio.Queue()
 
     # Stats for display
     total = 0
@@ -674,13 +643,12 @@ async def _add_packages_async(
     succeeded = 0
     conda_forge_count = 0
     need_input_count = 0
-    in_flight: list[str] = []
-
-    # Semaphore to limit concurrent requests
-    semaphore = asyncio.Semaphore(50)
+    in_flight: dict[str, None] = {}  # Insertion-ordered set
+    dirty = False
 
-    async with get_async_client() as client:
-        active_tasks: dict[asyncio.Task, str] = {}
+    async with contextlib.AsyncExitStack() as stack:
+        if client is None:
+            client = await stack.enter_async_context(get_async_client())
 
         def update_display(live: Live) -> None:
             table = _make_progress_table(
@@ -688,111 +656,126 @@ async def _add_packages_async(
             )
             live.update(table)
 
-        with Live(
-            _make_progress_table(0, 0, 0, 0, 0, []),
-            console=live_console,
-            refresh_per_second=4,
-        ) as live:
+        async def refresh_display(live: Live) -> None:
+            # Rebuild the table at a fixed rate, only when the stats changed
+            nonlocal dirty
+            while True:
+                await asyncio.sleep(_DISPLAY_REFRESH_INTERVAL)
+                if dirty:
+                    dirty = False
+                    update_display(live)
 
-            async def fetch_wrapper(
-                pkg: str, cons: str, req_by: str | None
-            ) -> tuple[_FetchResult, str, str | None]:
-                async with semaphore:
-                    result = await _fetch_single_package(pkg, cons, max_versions, client, req_by)
-                    return result, pkg, req_by
+        live = (
+            Live(
+                _make_progress_table(0, 0, 0, 0, 0, []),
+                console=live_console,
+                refresh_per_second=4,
+            )
+            if show_progress
+            else None
+        )
+        with live or contextlib.nullcontext():
 
-            def start_fetch(pkg: str, cons: str, req_by: str | None) -> asyncio.Task | None:
-                nonlocal total
-                normalized = pkg.lower().replace("_", "-")
+            def enqueue(pkg: str, cons: str, req_by: str | None) -> None:
+                nonlocal total, dirty
+                normalized = _norm(pkg)
 
                 if normalized in seen:
-                    return None
+                    return
                 seen.add(normalized)
 
-                if normalized in existing_packages and not force:
-                    live.console.print(f"[dim]Skipping {normalized} (exists)[/]")
-                    return None
+                if normalized in skip_packages:
+                    live_console.print(f"[dim]Skipping {normalized} (exists)[/]")
+                    return
 
                 total += 1
-                in_flight.append(normalized)
-                update_display(live)
+                in_flight[normalized] = None
+                dirty = True
+                queue.put_nowait((pkg, cons, req_by))
 
-                task = asyncio.create_task(fetch_wrapper(pkg, cons, req_by))
-                active_tasks[task] = normalized
-                return task
+            def handle_result(result: _FetchResult) -> None:
+                nonlocal succeeded, conda_forge_count, need_input_count
+                info = result.info
 
-            # Start initial package
-            start_fetch(package, constraint, None)
+                # Print warnings
+                for warning in info.warnings:
+                    live_console.print(Text(f"⚠ {warning}", style="dim yellow"))
 
-            while active_tasks or pending:
-                # Start any pending fetches
-                while pending:
-                    pkg, cons, req_by = pending.pop(0)
-                    start_fetch(pkg, cons, req_by)
-
-                if not active_tasks:
-                    break
-
-                # Wait for at least one task to complete
-                done, _ = await asyncio.wait(
-                    active_tasks.keys(), return_when=asyncio.FIRST_COMPLETED
-                )
-
-                for task in done:
-                    normalized = active_tasks.pop(task)
-                    if normalized in in_flight:
-                        in_flight.remove(normalized)
-                    completed += 1
-
-                    try:
-                        result, pkg_name, req_by = task.result()
-                    except Exception as e:
-                        live.console.print(f"[red]Error fetching {normalized}: {e}[/]")
-                        update_display(live)
-                        continue
-
-                    info = result.info
-
-                    # Print warnings
-                    for warning in info.warnings:
-                        live.console.print(f"[dim yellow]⚠ {warning}[/]")
-
-                    if info.error:
-                        if result.conda_name:
-                            # Has conda-forge mapping - use it
-                            info.conda_forge = result.conda_name
-                            packages_to_add.append(info)
-                            succeeded += 1
-                            conda_forge_count += 1
-                            live.console.print(
-                                f"[green]✓[/] {info.name} → conda-forge: {result.conda_name}"
-                            )
-                        else:
-                            # Needs user input
-                            needs_input.append(info)
-                            need_input_count += 1
-                            err_short = info.error[:50] + "..." if len(info.error) > 50 else info.error
-                            live.console.print(f"[yellow]?[/] {info.name}: {err_short}")
-                    else:
-                        # Success
+                if info.error:
+                    if result.conda_name:
+                        # Has conda-forge mapping - use it
                         info.conda_forge = result.conda_name
                         packages_to_add.append(info)
                         succeeded += 1
-                        if result.conda_name:
-                            conda_forge_count += 1
-
-                        wheel_count = len(info.wheels)
-                        conda_info = f" [dim](cf: {result.conda_name})[/]" if result.conda_name else ""
-                        live.console.print(f"[green]✓[/] {info.name}: {wheel_count} wheels{conda_info}")
-
-                        # Queue dependencies
-                        all_deps = info.required_deps | info.optional_deps
-                        for dep in sorted(all_deps):
-                            dep_normalized = dep.lower().replace("_", "-")
-                            if dep_normalized not in seen:
-                                pending.append((dep, "", info.name))
-
-                    update_display(live)
+                        conda_forge_count += 1
+                        live_console.print(
+                            Text.assemble(
+                                _OK_PREFIX, f"{info.name} → conda-forge: {result.conda_name}"
+                            )
+                        )
+                    else:
+                        # Needs user input
+                        needs_input.append(info)
+                        need_input_count += 1
+                        err_short = info.error if len(info.error) <= 50 else f"{info.error[:50]}..."
+                        live_console.print(
+                            Text.assemble(_NEEDS_INPUT_PREFIX, f"{info.name}: {err_short}")
+                        )
+                else:
+                    # Success
+                    info.conda_forge = result.conda_name
+                    packages_to_add.append(info)
+                    succeeded += 1
+                    if result.conda_name:
+                        conda_forge_count += 1
+
+                    wheel_count = len(info.wheels)
+                    conda_info = (f" (cf: {result.conda_name})", "dim") if result.conda_name else ""
+                    live_console.print(
+                        Text.assemble(
+                            _OK_PREFIX, f"{info.name}: {wheel_count} wheels", conda_info
+                        )
+                    )
+
+                    # Queue dependencies
+                    all_deps = info.required_deps | info.optional_deps
+                    for dep in sorted(all_deps):
+                        enqueue(dep, "", info.name)
+
+            async def worker() -> None:
+                nonlocal completed, dirty
+                while True:
+                    pkg, cons, req_by = await queue.get()
+                    normalized = _norm(pkg)
+                    # A failure while handling the result must not end the worker
+                    try:
+                        result = await _fetch_single_package(
+                            pkg, cons, max_versions, client, req_by
+                        )
+                        handle_result(result)
+                    except Exception as e:
+                        live_console.print(f"[red]Error fetching {normalized}: {e}[/]")
+                    finally:
+                        in_flight.pop(normalized, None)
+                        completed += 1
+                        dirty = True
+                        queue.task_done()
+
+            background = [
+                asyncio.create_task(worker()) for _ in range(_MAX_CONCURRENT_REQUESTS)
+            ]
+            if live is not None:
+                background.append(asyncio.create_task(refresh_display(live)))
+
+            # Start with the requested package; workers queue its dependencies
+            enqueue(package, constraint, None)
+            await queue.join()
+
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            if live is not None:
+                update_display(live)
 
     return packages_to_add, needs_input, False
 
@@ -830,37 +813,40 @@ def _prompt_for_package(info: PackageInfo, console: Console) -> tuple[str, str |
         return "abort", None
 
 
+def _atomic_write_text(path: Path, content: str) -> None:
+    """Write a text file atomically through a temp file and a rename."""
+    temp_path = path.with_suffix(f"{path.suffix}.tmp")
+    with open(temp_path, "w") as f:
+        f.write(content)
+    temp_path.replace(path)
+
+
 def _write_package_files(
     info: PackageInfo,
     packages_dir: Path,
     state_dir: Path,
     console: Console,
 ) -> None:
-    """Write package config and state files."""
-    packages_dir.mkdir(parents=True, exist_ok=True)
-    state_dir.mkdir(parents=True, exist_ok=True)
-
-    # Build config content
-    config_lines = [f"# Package configuration for {info.name}"]
-
+    """Write package config and state files into existing directories."""
     # Add conda_forge mapping if present
-    if info.conda_forge:
-        config_lines.append(f'conda_forge = "{info.conda_forge}"')
+    conda_line = f'conda_forge = "{info.conda_forge}"\n' if info.conda_forge else ""
 
     # Add wheels section if we have wheels
+    wheels_section = ""
     if info.wheels:
-        config_lines.append(f'version_constraint = "{info.constraint}"')
-        config_lines.append("skip_versions = []")
-        config_lines.append("")
-        config_lines.append("wheels = [")
-        for release, wheel in info.wheels:
-            config_lines.append(f'  {{ filename = "{wheel.filename}" }},')
-        config_lines.append("]")
+        wheel_rows = "".join(
+            f'  {{ filename = "{wheel.filename}" }},\n' for _, wheel in info.wheels
+        )
+        wheels_section = (
+            f'version_constraint = "{info.constraint}"\n'
+            "skip_versions = []\n"
+            "\n"
+            f"wheels = [\n{wheel_rows}]\n"
+        )
 
-    config_content = "\n".join(config_lines) + "\n"
+    config_content = f"# Package configuration for {info.name}\n{conda_line}{wheels_section}"
 
-    config_path = packages_dir / f"{info.name}.toml"
-    config_path.write_text(config_content)
+    _atomic_write_text(packages_dir / f"{info.name}.toml", config_content)
 
     # Create state/<name>.json with pending wheels (only if we have wheels)
     if info.wheels:
@@ -871,13 +857,9 @@ def _write_package_files(
             original_reqs = None
             if wheel.filename in info.wheel_dependencies:
                 original_reqs = info.wheel_dependencies[wheel.filename]
-                req_deps = []
-                for d in original_reqs:
-                    if _is_required_dep(d):
-                        dep_name = _extract_dep_name(d)
-                        if dep_name != "python":
-                            req_deps.append(dep_name)
-                deps = Dependencies(required=req_deps, optional={})
+                deps = Dependencies(
+                    required=info.wheel_required_deps.get(wheel.filename, []), optional={}
+                )
 
             state[wheel.filename] = WheelState(
                 status="pending",
@@ -901,11 +883,8 @@ def _write_empty_package(
     state_dir: Path,
     console: Console,
 ) -> None:
-    """Create a package config with no wheels."""
-    normalized = package.lower().replace("_", "-")
-
-    packages_dir.mkdir(parents=True, exist_ok=True)
-    state_dir.mkdir(parents=True, exist_ok=True)
+    """Create a package config with no wheels in existing directories."""
+    normalized = _norm(package)
 
     # Create packages/<name>.toml with empty wheels
     config_content = f'''# Package configuration for {normalized}
@@ -916,12 +895,10 @@ skip_versions = []
 wheels = []
 '''
 
-    config_path = packages_dir / f"{normalized}.toml"
-    config_path.write_text(config_content)
+    _atomic_write_text(packages_dir / f"{normalized}.toml", config_content)
 
     # Create empty state file
-    state_path = state_dir / f"{normalized}.json"
-    state_path.write_text("{}\n")
+    _atomic_write_text(state_dir / f"{normalized}.json", "{}\n")
 
     console.print(f"[cyan]Created empty package:[/] {normalized} (no wheels)")
 
@@ -932,28 +909,58 @@ def _write_conda_forge_package(
     packages_dir: Path,
     console: Console,
 ) -> None:
-    """Create a package config that references a conda-forge package."""
-    normalized = package.lower().replace("_", "-")
+    """Create a package config that references a conda-forge package.
 
-    packages_dir.mkdir(parents=True, exist_ok=True)
+    packages_dir must already exist.
+    """
+    normalized = _norm(package)
 
     # Create packages/<name>.toml with conda_forge reference
     config_content = f'''# {normalized} - available on conda-forge
 conda_forge = "{conda_name}"
 '''
 
-    config_path = packages_dir / f"{normalized}.toml"
-    config_path.write_text(config_content)
+    _atomic_write_text(packages_dir / f"{normalized}.toml", config_content)
 
     console.print(f"[green]Created conda-forge reference:[/] {normalized} -> {conda_name}")
 
 
+async def _write_packages_async(
+    packages: list[PackageInfo],
+    empty_packages: list[str],
+    packages_dir: Path,
+    state_dir: Path,
+    console: Console,
+) -> None:
+    """Write the files of all packages concurrently on worker threads."""
+    import asyncio
+
+    await asyncio.gather(
+        *(
+            asyncio.to_thread(_write_package_files, info, packages_dir, state_dir, console)
+            for info in packages
+        ),
+        *(
+            asyncio.to_thread(_write_empty_package, name, packages_dir, state_dir, console)
+            for name in empty_packages
+        ),
+    )
+
+
 def cmd_add(args: argparse.Namespace) -> int:
-    """Add a new package to the channel.
+    """Add a new package to the channel."""
+    return _run_async(cmd_add_async(args))
+
+
+async def cmd_add_async(args: argparse.Namespace) -> int:
+    """Add a new package to the channel from a running event loop.
 
     Uses concurrent fetching with Rich Live progress display.
-    Packages needing user input are prompted after fetching completes.
+    Packages needing user input are prompted after fetching completes, on
+    a worker thread so the blocking prompt does not stall the event loop.
     """
+    import asyncio
+
     package = args.package
     constraint = args.constraint or ""
     max_versions = args.versions
@@ -968,15 +975,14 @@ def cmd_add(args: argparse.Namespace) -> int:
     console.print()
 
     # Run async fetching
-    packages_to_add, needs_input, _ = asyncio.run(
-        _add_packages_async(
-            package=package,
-            constraint=constraint,
-            max_versions=max_versions,
-            packages_dir=packages_dir,
-            force=args.force,
-            live_console=console,
-        )
+    packages_to_add, needs_input, _ = await _add_packages_async(
+        package=package,
+        constraint=constraint,
+        max_versions=max_versions,
+        packages_dir=packages_dir,
+        force=args.force,
+        live_console=console,
+        show_progress=console.is_terminal and not non_interactive,
     )
 
     console.print()
@@ -990,11 +996,13 @@ def cmd_add(args: argparse.Namespace) -> int:
     if needs_input:
         if non_interactive:
             console.print(f"[red]Error:[/] {len(needs_input)} package(s) need user input (non-interactive mode):")
+            lines = []
             for info in needs_input[:10]:  # Show first 10
                 req_info = f" (required by {info.required_by})" if info.required_by else ""
-                console.print(f"  - {info.name}{req_info}: {info.error}")
+                lines.append(f"  - {info.name}{req_info}: {info.error}")
             if len(needs_input) > 10:
-                console.print(f"  ... and {len(needs_input) - 10} more")
+                lines.append(f"  ... and {len(needs_input) - 10} more")
+            console.print("\n".join(lines))
             console.print()
             console.print("[yellow]No files were written.[/]")
             console.print("[dim]Tip: Run interactively to resolve these packages, or pre-create conda-forge references.[/]")
@@ -1004,7 +1012,7 @@ def cmd_add(args: argparse.Namespace) -> int:
         console.print()
 
         for info in needs_input:
-            action, value = _prompt_for_package(info, console)
+            action, value = await asyncio.to_thread(_prompt_for_package, info, console)
 
             if action == "abort":
                 aborted = True
@@ -1030,24 +1038,26 @@ def cmd_add(args: argparse.Namespace) -> int:
         console.print()
         console.print("[bold]Dry run - no files written[/]")
         console.print()
-        console.print(f"Would add {total_to_add} package(s):")
+        lines = [f"Would add {total_to_add} package(s):"]
         for info in packages_to_add:
             wheel_info = f"{len(info.wheels)} wheel(s)" if info.wheels else "conda-forge only"
             conda_info = f", conda-forge: {info.conda_forge}" if info.conda_forge else ""
-            console.print(f"  [dim]-[/] {info.name} ({wheel_info}{conda_info})")
+            lines.append(f"  [dim]-[/] {info.name} ({wheel_info}{conda_info})")
         for pkg_name in empty_packages_to_add:
-            console.print(f"  [dim]-[/] {pkg_name} (empty package)")
+            lines.append(f"  [dim]-[/] {pkg_name} (empty package)")
+        console.print("\n".join(lines))
         return 0
 
     console.print()
     console.print("[bold]Writing package files...[/]")
     console.print()
 
-    for info in packages_to_add:
-        _write_package_files(info, packages_dir, state_dir, console)
+    packages_dir.mkdir(parents=True, exist_ok=True)
+    state_dir.mkdir(parents=True, exist_ok=True)
 
-    for pkg_name in empty_packages_to_add:
-        _write_empty_package(pkg_name, packages_dir, state_dir, console)
+    await _write_packages_async(
+        packages_to_add, empty_packages_to_add, packages_dir, state_dir, console
+    )
 
     console.print()
     console.print(f"[bold green]Successfully added {total_to_add} package(s)[/]")
@@ -1055,8 +1065,9 @@ def cmd_add(args: argparse.Namespace) -> int:
     return 0
 
 
-def main(argv: list[str] | None = None) -> int:
-    """Main entry point for cart-wheel CLI."""
+@functools.lru_cache(maxsize=None)
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the cart-wheel argument parser, once per process."""
     parser = argparse.ArgumentParser(
         prog="cart-wheel",
         description="Convert Python wheels to conda packages",
@@ -1213,8 +1224,51 @@ def main(argv: list[str] | None = None) -> int:
         default=DEFAULT_OUTPUT_DIR,
         help=f"Output directory (default: {DEFAULT_OUTPUT_DIR})",
     )
+    index_parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="Also write sharded repodata (CEP-16)",
+    )
+    index_parser.add_argument(
+        "--compression-level",
+        type=int,
+        default=None,
+        help="Zstandard level for repodata.json.zst (default: 19)",
+    )
+    index_parser.add_argument(
+        "--zstd-dict",
+        type=Path,
+        default=None,
+        help="Also write repodata.json.dict.zst compressed with this dictionary "
+        "(only clients configured with it can read that file)",
+    )
     index_parser.set_defaults(func=cmd_index)
 
+    # train-dict subcommand
+    train_dict_parser = subparsers.add_parser(
+        "train-dict",
+        help="Train a zstd dictionary for repodata compression",
+    )
+    train_dict_parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=DEFAULT_OUTPUT_DIR,
+        help=f"Output directory of an indexed channel (default: {DEFAULT_OUTPUT_DIR})",
+    )
+    train_dict_parser.add_argument(
+        "--dict-path",
+        type=Path,
+        default=None,
+        help="Where to write the dictionary (default: <output-dir>/repodata.zdict)",
+    )
+    train_dict_parser.add_argument(
+        "--size",
+        type=int,
+        default=None,
+        help="Maximum dictionary size in bytes (default: 64 KiB)",
+    )
+    train_dict_parser.set_defaults(func=cmd_train_dict)
+
     # status subcommand
     status_parser = subparsers.add_parser(
         "status",
@@ -1285,7 +1339,12 @@ def main(argv: list[str] | None = None) -> int:
     )
     add_parser.set_defaults(func=cmd_add)
 
-    args = parser.parse_args(argv)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Main entry point for cart-wheel CLI."""
+    args = _build_parser().parse_args(argv)
     return args.func(args)
 
 
@@ -1,15 +1,15 @@
 """Conda package building utilities."""
 
-import io
-import json
+import functools
 import re
 import tempfile
 import zipfile
 from collections.abc import Iterable
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import BinaryIO
 
-import zstandard as zstd
+import orjson
 from packaging.markers import Marker
 from packaging.requirements import Requirement
 
@@ -37,6 +37,18 @@ class ConversionResult:
     original_requirements: list[str] = field(default_factory=list)
 
 
+# Wheel members that have to be spooled (unknown size, or async input) stay
+# in memory up to this many bytes and spill to a temp file beyond it
+_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Contents of the .conda outer metadata.json (the format version never varies)
+_CONDA_METADATA_JSON = b'{"conda_pkg_format_version": 2}'
+
+# Markers that only select an extra, or combine an extra with another condition
+_PURE_EXTRA_RE = re.compile(r"extra\s*==\s*['\"]([^'\"]+)['\"]")
+_EXTRA_AND_RE = re.compile(r"extra\s*==\s*['\"]([^'\"]+)['\"]\s+and\s+(.+)")
+_AND_EXTRA_RE = re.compile(r"(.+)\s+and\s+extra\s*==\s*['\"]([^'\"]+)['\"]")
+
 # Platform marker mappings to conda platform flags
 _PLATFORM_MAP = {
     "win32": "__win",
@@ -51,31 +63,27 @@ _PLATFORM_SYSTEM_MAP = {
     "Darwin": "__osx",
 }
 
+# Platform mapping for each marker variable that names a platform
+_PLATFORM_MAPS = {
+    "sys_platform": _PLATFORM_MAP,
+    "platform_system": _PLATFORM_SYSTEM_MAP,
+}
+
 
+@functools.lru_cache(maxsize=256)
 def _convert_marker_atom(variable: str, op: str, value: str) -> str:
-    """Convert a single marker comparison to conda condition."""
+    """Convert a single marker comparison to conda condition.
+
+    Cached because the same few comparisons recur across dependencies.
+    """
     if variable == "python_version":
         return f"python {op}{value}"
 
-    if variable == "sys_platform":
-        if op == "==":
-            if value in _PLATFORM_MAP:
-                return _PLATFORM_MAP[value]
-            raise DependencyConversionError(f"Unknown sys_platform value: {value}")
-        elif op == "!=":
-            if value in _PLATFORM_MAP:
-                return f"not {_PLATFORM_MAP[value]}"
-            raise DependencyConversionError(f"Unknown sys_platform value: {value}")
-
-    if variable == "platform_system":
-        if op == "==":
-            if value in _PLATFORM_SYSTEM_MAP:
-                return _PLATFORM_SYSTEM_MAP[value]
-            raise DependencyConversionError(f"Unknown platform_system value: {value}")
-        elif op == "!=":
-            if value in _PLATFORM_SYSTEM_MAP:
-                return f"not {_PLATFORM_SYSTEM_MAP[value]}"
-            raise DependencyConversionError(f"Unknown platform_system value: {value}")
+    if variable in _PLATFORM_MAPS and op in ("==", "!="):
+        flag = _PLATFORM_MAPS[variable].get(value)
+        if flag is None:
+            raise DependencyConversionError(f"Unknown {variable} value: {value}")
+        return flag if op == "==" else f"not {flag}"
 
     if variable == "os_name":
         if op == "==":
@@ -224,31 +232,40 @@ def _marker_to_condition(marker: Marker) -> str:
     return _convert_marker_tree(marker._markers)
 
 
+@functools.lru_cache(maxsize=1024)
+def _marker_str_to_condition(marker_str: str) -> str:
+    """Convert a marker given as text, caching the parse and conversion."""
+    return _marker_to_condition(Marker(marker_str))
+
+
 def _extract_extra_from_marker(marker: Marker) -> tuple[str | None, str | None]:
     """Extract the extra name and any remaining condition from a marker."""
-    marker_str = str(marker)
+    marker_str = str(marker).strip()
 
-    pure_match = re.fullmatch(r"extra\s*==\s*['\"]([^'\"]+)['\"]", marker_str.strip())
+    pure_match = _PURE_EXTRA_RE.fullmatch(marker_str)
     if pure_match:
         return (pure_match.group(1), None)
 
-    and_match = re.match(
-        r"extra\s*==\s*['\"]([^'\"]+)['\"]\s+and\s+(.+)",
-        marker_str.strip(),
-    )
+    and_match = _EXTRA_AND_RE.match(marker_str)
     if and_match:
         return (and_match.group(1), and_match.group(2))
 
-    and_match_reverse = re.match(
-        r"(.+)\s+and\s+extra\s*==\s*['\"]([^'\"]+)['\"]",
-        marker_str.strip(),
-    )
+    and_match_reverse = _AND_EXTRA_RE.match(marker_str)
     if and_match_reverse:
         return (and_match_reverse.group(2), and_match_reverse.group(1))
 
     return (None, None)
 
 
+@functools.lru_cache(maxsize=4096)
+def _parse_requirement(req_str: str) -> Requirement:
+    """Parse a requirement string.
+
+    Cached because common dependencies recur across the wheels of a sync.
+    """
+    return Requirement(req_str)
+
+
 def _requirement_to_conda_dep(req: Requirement, condition: str | None = None) -> str:
     """Convert a packaging Requirement to a conda dependency string."""
     name = req.name.lower().replace("_", "-")
@@ -267,21 +284,6 @@ def _requirement_to_conda_dep(req: Requirement, condition: str | None = None) ->
     return dep
 
 
-def _create_tar_zst(file_dict: dict[str, bytes]) -> bytes:
-    """Create a zstd-compressed tarball from a dict of {path: content}."""
-    import tarfile
-
-    tar_buffer = io.BytesIO()
-    with tarfile.open(fileobj=tar_buffer, mode="w") as tar:
-        for name, content in file_dict.items():
-            info = tarfile.TarInfo(name=name)
-            info.size = len(content)
-            tar.addfile(info, io.BytesIO(content))
-
-    cctx = zstd.ZstdCompressor(level=19)
-    return cctx.compress(tar_buffer.getvalue())
-
-
 def _convert_dependencies(
     dependencies: list[str],
     requires_python: str | None,
@@ -301,15 +303,14 @@ def _convert_dependencies(
         conda_deps.append("python")
 
     for req_str in dependencies:
-        req = Requirement(req_str)
+        req = _parse_requirement(req_str)
 
         if req.marker:
             extra_name, remaining_marker = _extract_extra_from_marker(req.marker)
             if extra_name:
                 condition = None
                 if remaining_marker:
-                    remaining_marker_obj = Marker(remaining_marker)
-                    condition = _marker_to_condition(remaining_marker_obj)
+                    condition = _marker_str_to_condition(remaining_marker)
                     # Handle special markers for CPython
                     if condition == "__SKIP_DEP":
                         continue  # Skip this dependency
@@ -335,6 +336,15 @@ def _convert_dependencies(
     return conda_deps, extras
 
 
+def _add_spooled_file(
+    pkg_writer: StreamingTarZstWriter, dest_path: str, spool: BinaryIO
+) -> None:
+    """Stream a fully written spool file into the package archive."""
+    size = spool.tell()
+    spool.seek(0)
+    pkg_writer.add_stream(dest_path, spool, size)
+
+
 def _iter_file(path: Path, chunk_size: int = 65536) -> Iterable[bytes]:
     """Yield chunks from a file."""
     with open(path, "rb") as f:
@@ -366,6 +376,143 @@ class _ChunksAsFile:
         return result
 
 
+def _write_conda_package(
+    pkg_archive: Path,
+    file_metadata: list[FileMetadata],
+    buffered_metadata: dict[str, bytes],
+    dist_info_prefix: str,
+    wheel_filename: str,
+    output_dir: Path,
+) -> ConversionResult:
+    """Write the .conda file for a wheel whose pkg archive is already built.
+
+    The info archive is streamed straight into the .conda zip, so each info
+    file is compressed as soon as it is generated.
+    """
+    # Parse metadata from buffered content
+    metadata_content = buffered_metadata.get(f"{dist_info_prefix}/METADATA")
+    wheel_content = buffered_metadata.get(f"{dist_info_prefix}/WHEEL")
+    entry_points_content = buffered_metadata.get(f"{dist_info_prefix}/entry_points.txt")
+
+    if not metadata_content or not wheel_content:
+        raise ValueError("Missing required METADATA or WHEEL file")
+
+    wheel_metadata = parse_wheel_metadata(
+        metadata_content=metadata_content,
+        wheel_content=wheel_content,
+        entry_points_content=entry_points_content,
+        filename=wheel_filename,
+    )
+
+    # Convert dependencies
+    dependencies, extra_depends = _convert_dependencies(
+        wheel_metadata.dependencies,
+        wheel_metadata.requires_python,
+    )
+    entry_points = wheel_metadata.console_scripts + wheel_metadata.gui_scripts
+
+    dist_name = f"{wheel_metadata.conda_name}-{wheel_metadata.version}-py_0"
+    conda_path = output_dir / f"{dist_name}.conda"
+
+    with zipfile.ZipFile(conda_path, "w", compression=zipfile.ZIP_STORED) as conda_zip:
+        conda_zip.writestr("metadata.json", _CONDA_METADATA_JSON)
+
+        # Build info archive (small, so compressed inline)
+        with conda_zip.open(f"info-{dist_name}.tar.zst", "w") as info_file:
+            with StreamingTarZstWriter(info_file, threads=0) as info_writer:
+                # index.json
+                index_json: dict = {
+                    "name": wheel_metadata.conda_name,
+                    "version": wheel_metadata.version,
+                    "build": "py_0",
+                    "build_number": 0,
+                    "depends": dependencies,
+                    "subdir": wheel_metadata.conda_subdir,
+                }
+
+                if extra_depends:
+                    index_json["extra_depends"] = extra_depends
+
+                if wheel_metadata.license:
+                    index_json["license"] = wheel_metadata.license
+
+                if wheel_metadata.is_pure_python:
+                    index_json["noarch"] = "python"
+
+                info_writer.add_file(
+                    "info/index.json",
+                    orjson.dumps(index_json, option=orjson.OPT_INDENT_2),
+                )
+
+                # paths.json
+                paths_json = {
+                    "paths": [
+                        {
+                            "_path": fm.path,
+                            "path_type": "hardlink",
+                            "sha256": fm.sha256,
+                            "size_in_bytes": fm.size,
+                        }
+                        for fm in file_metadata
+                    ],
+                    "paths_version": 1,
+                }
+                info_writer.add_file(
+                    "info/paths.json",
+                    orjson.dumps(paths_json, option=orjson.OPT_INDENT_2),
+                )
+
+                # files list
+                files_content = "\n".join(fm.path for fm in file_metadata)
+                info_writer.add_file("info/files", files_content.encode())
+
+                # about.json
+                about_json: dict = {}
+                if wheel_metadata.summary:
+                    about_json["summary"] = wheel_metadata.summary
+                if wheel_metadata.description:
+                    about_json["description"] = wheel_metadata.description
+                if wheel_metadata.home_url:
+                    about_json["home"] = wheel_metadata.home_url
+                if wheel_metadata.doc_url:
+                    about_json["doc_url"] = wheel_metadata.doc_url
+                if wheel_metadata.dev_url:
+                    about_json["dev_url"] = wheel_metadata.dev_url
+                if wheel_metadata.source_url:
+                    about_json["source_url"] = wheel_metadata.source_url
+                info_writer.add_file(
+                    "info/about.json",
+                    orjson.dumps(about_json, option=orjson.OPT_INDENT_2),
+                )
+
+                # link.json
+                if wheel_metadata.is_pure_python:
+                    noarch_data: dict = {"type": "python"}
+                    if entry_points:
+                        noarch_data["entry_points"] = entry_points
+                    link_json = {
+                        "noarch": noarch_data,
+                        "package_metadata_version": 1,
+                    }
+                    info_writer.add_file(
+                        "info/link.json",
+                        orjson.dumps(link_json, option=orjson.OPT_INDENT_2),
+                    )
+
+        conda_zip.write(pkg_archive, f"pkg-{dist_name}.tar.zst")
+
+    return ConversionResult(
+        path=conda_path,
+        name=wheel_metadata.conda_name,
+        version=wheel_metadata.version,
+        dependencies=dependencies,
+        extra_depends=extra_depends,
+        entry_points=entry_points,
+        subdir=wheel_metadata.conda_subdir,
+        original_requirements=wheel_metadata.dependencies,
+    )
+
+
 def convert_wheel(
     source: Path | Iterable[bytes],
     output_dir: Path,
@@ -449,9 +596,11 @@ def convert_wheel(
                             dest_path, _ChunksAsFile(file_chunks), file_size
                         )
                     else:
-                        # Size unknown, must buffer
-                        content = b"".join(file_chunks)
-                        pkg_writer.add_file(dest_path, content)
+                        # Size unknown, spool to learn it before the tar header
+                        with tempfile.SpooledTemporaryFile(_SPOOL_MAX_SIZE) as spool:
+                            for chunk in file_chunks:
+                                spool.write(chunk)
+                            _add_spooled_file(pkg_writer, dest_path, spool)
 
                 if dist_info_prefix is None:
                     raise ValueError("No .dist-info directory found in wheel")
@@ -462,134 +611,13 @@ def convert_wheel(
 
                 file_metadata = pkg_writer.get_file_metadata()
 
-            # Parse metadata from buffered content
-            metadata_content = buffered_metadata.get(f"{dist_info_prefix}/METADATA")
-            wheel_content = buffered_metadata.get(f"{dist_info_prefix}/WHEEL")
-            entry_points_content = buffered_metadata.get(
-                f"{dist_info_prefix}/entry_points.txt"
-            )
-
-            if not metadata_content or not wheel_content:
-                raise ValueError("Missing required METADATA or WHEEL file")
-
-            wheel_metadata = parse_wheel_metadata(
-                metadata_content=metadata_content,
-                wheel_content=wheel_content,
-                entry_points_content=entry_points_content,
-                filename=wheel_filename,
-            )
-
-            # Convert dependencies
-            dependencies, extra_depends = _convert_dependencies(
-                wheel_metadata.dependencies,
-                wheel_metadata.requires_python,
-            )
-
-            # Build info archive
-            info_files: dict[str, bytes] = {}
-
-            # index.json
-            index_json: dict = {
-                "name": wheel_metadata.conda_name,
-                "version": wheel_metadata.version,
-                "build": "py_0",
-                "build_number": 0,
-                "depends": dependencies,
-                "subdir": wheel_metadata.conda_subdir,
-            }
-
-            if extra_depends:
-                index_json["extra_depends"] = extra_depends
-
-            if wheel_metadata.license:
-                index_json["license"] = wheel_metadata.license
-
-            if wheel_metadata.is_pure_python:
-                index_json["noarch"] = "python"
-
-            info_files["info/index.json"] = json.dumps(index_json, indent=2).encode()
-
-            # paths.json
-            paths_json = {
-                "paths": [
-                    {
-                        "_path": fm.path,
-                        "path_type": "hardlink",
-                        "sha256": fm.sha256,
-                        "size_in_bytes": fm.size,
-                    }
-                    for fm in file_metadata
-                ],
-                "paths_version": 1,
-            }
-            info_files["info/paths.json"] = json.dumps(paths_json, indent=2).encode()
-
-            # files list
-            files_content = "\n".join(fm.path for fm in file_metadata)
-            info_files["info/files"] = files_content.encode()
-
-            # about.json
-            about_json: dict = {}
-            if wheel_metadata.summary:
-                about_json["summary"] = wheel_metadata.summary
-            if wheel_metadata.description:
-                about_json["description"] = wheel_metadata.description
-            if wheel_metadata.home_url:
-                about_json["home"] = wheel_metadata.home_url
-            if wheel_metadata.doc_url:
-                about_json["doc_url"] = wheel_metadata.doc_url
-            if wheel_metadata.dev_url:
-                about_json["dev_url"] = wheel_metadata.dev_url
-            if wheel_metadata.source_url:
-                about_json["source_url"] = wheel_metadata.source_url
-            info_files["info/about.json"] = json.dumps(about_json, indent=2).encode()
-
-            # link.json
-            if wheel_metadata.is_pure_python:
-                noarch_data: dict = {"type": "python"}
-                entry_points = (
-                    wheel_metadata.console_scripts + wheel_metadata.gui_scripts
-                )
-                if entry_points:
-                    noarch_data["entry_points"] = entry_points
-                link_json = {
-                    "noarch": noarch_data,
-                    "package_metadata_version": 1,
-                }
-                info_files["info/link.json"] = json.dumps(link_json, indent=2).encode()
-
-            info_tar_zst = _create_tar_zst(info_files)
-
-            # Write final .conda file
-            conda_name = (
-                f"{wheel_metadata.conda_name}-{wheel_metadata.version}-py_0.conda"
-            )
-            conda_path = output_dir / conda_name
-
-            with zipfile.ZipFile(
-                conda_path, "w", compression=zipfile.ZIP_STORED
-            ) as conda_zip:
-                conda_zip.writestr(
-                    "metadata.json", json.dumps({"conda_pkg_format_version": 2})
-                )
-
-                info_name = f"info-{wheel_metadata.conda_name}-{wheel_metadata.version}-py_0.tar.zst"
-                conda_zip.writestr(info_name, info_tar_zst)
-
-                pkg_name = f"pkg-{wheel_metadata.conda_name}-{wheel_metadata.version}-py_0.tar.zst"
-                conda_zip.write(pkg_tmp_path, pkg_name)
-
-            entry_points = wheel_metadata.console_scripts + wheel_metadata.gui_scripts
-
-        return ConversionResult(
-            path=conda_path,
-            name=wheel_metadata.conda_name,
-            version=wheel_metadata.version,
-            dependencies=dependencies,
-            extra_depends=extra_depends,
-            entry_points=entry_points,
-            subdir=wheel_metadata.conda_subdir,
-            original_requirements=wheel_metadata.dependencies,
+        return _write_conda_package(
+            pkg_tmp_path,
+            file_metadata,
+            buffered_metadata,
+            dist_info_prefix,
+            wheel_filename,
+            output_dir,
         )
     finally:
         # Cleanup temp file
@@ -657,16 +685,18 @@ async def convert_wheel_async(
                         f"{dist_info_prefix}/entry_points.txt",
                     }
 
-                    # Collect all chunks for this file
-                    content_chunks = []
-                    async for chunk in file_chunks:
-                        content_chunks.append(chunk)
-                    content = b"".join(content_chunks)
-
                     if is_metadata:
+                        # Buffer small metadata files
+                        content = b"".join([chunk async for chunk in file_chunks])
                         buffered_metadata[file_name] = content
+                        pkg_writer.add_file(dest_path, content)
+                        continue
 
-                    pkg_writer.add_file(dest_path, content)
+                    # tarfile reads synchronously, so spool the async chunks first
+                    with tempfile.SpooledTemporaryFile(_SPOOL_MAX_SIZE) as spool:
+                        async for chunk in file_chunks:
+                            spool.write(chunk)
+                        _add_spooled_file(pkg_writer, dest_path, spool)
 
                 if dist_info_prefix is None:
                     raise ValueError("No .dist-info directory found in wheel")
@@ -677,134 +707,13 @@ async def convert_wheel_async(
 
                 file_metadata = pkg_writer.get_file_metadata()
 
-            # Parse metadata from buffered content
-            metadata_content = buffered_metadata.get(f"{dist_info_prefix}/METADATA")
-            wheel_content = buffered_metadata.get(f"{dist_info_prefix}/WHEEL")
-            entry_points_content = buffered_metadata.get(
-                f"{dist_info_prefix}/entry_points.txt"
-            )
-
-            if not metadata_content or not wheel_content:
-                raise ValueError("Missing required METADATA or WHEEL file")
-
-            wheel_metadata = parse_wheel_metadata(
-                metadata_content=metadata_content,
-                wheel_content=wheel_content,
-                entry_points_content=entry_points_content,
-                filename=filename,
-            )
-
-            # Convert dependencies
-            dependencies, extra_depends = _convert_dependencies(
-                wheel_metadata.dependencies,
-                wheel_metadata.requires_python,
-            )
-
-            # Build info archive
-            info_files: dict[str, bytes] = {}
-
-            # index.json
-            index_json: dict = {
-                "name": wheel_metadata.conda_name,
-                "version": wheel_metadata.version,
-                "build": "py_0",
-                "build_number": 0,
-                "depends": dependencies,
-                "subdir": wheel_metadata.conda_subdir,
-            }
-
-            if extra_depends:
-                index_json["extra_depends"] = extra_depends
-
-            if wheel_metadata.license:
-                index_json["license"] = wheel_metadata.license
-
-            if wheel_metadata.is_pure_python:
-                index_json["noarch"] = "python"
-
-            info_files["info/index.json"] = json.dumps(index_json, indent=2).encode()
-
-            # paths.json
-            paths_json = {
-                "paths": [
-                    {
-                        "_path": fm.path,
-                        "path_type": "hardlink",
-                        "sha256": fm.sha256,
-                        "size_in_bytes": fm.size,
-                    }
-                    for fm in file_metadata
-                ],
-                "paths_version": 1,
-            }
-            info_files["info/paths.json"] = json.dumps(paths_json, indent=2).encode()
-
-            # files list
-            files_content = "\n".join(fm.path for fm in file_metadata)
-            info_files["info/files"] = files_content.encode()
-
-            # about.json
-            about_json: dict = {}
-            if wheel_metadata.summary:
-                about_json["summary"] = wheel_metadata.summary
-            if wheel_metadata.description:
-                about_json["description"] = wheel_metadata.description
-            if wheel_metadata.home_url:
-                about_json["home"] = wheel_metadata.home_url
-            if wheel_metadata.doc_url:
-                about_json["doc_url"] = wheel_metadata.doc_url
-            if wheel_metadata.dev_url:
-                about_json["dev_url"] = wheel_metadata.dev_url
-            if wheel_metadata.source_url:
-                about_json["source_url"] = wheel_metadata.source_url
-            info_files["info/about.json"] = json.dumps(about_json, indent=2).encode()
-
-            # link.json
-            if wheel_metadata.is_pure_python:
-                noarch_data: dict = {"type": "python"}
-                entry_points = (
-                    wheel_metadata.console_scripts + wheel_metadata.gui_scripts
-                )
-                if entry_points:
-                    noarch_data["entry_points"] = entry_points
-                link_json = {
-                    "noarch": noarch_data,
-                    "package_metadata_version": 1,
-                }
-                info_files["info/link.json"] = json.dumps(link_json, indent=2).encode()
-
-            info_tar_zst = _create_tar_zst(info_files)
-
-            # Write final .conda file
-            conda_name = (
-                f"{wheel_metadata.conda_name}-{wheel_metadata.version}-py_0.conda"
-            )
-            conda_path = output_dir / conda_name
-
-            with zipfile.ZipFile(
-                conda_path, "w", compression=zipfile.ZIP_STORED
-            ) as conda_zip:
-                conda_zip.writestr(
-                    "metadata.json", json.dumps({"conda_pkg_format_version": 2})
-                )
-
-                info_name = f"info-{wheel_metadata.conda_name}-{wheel_metadata.version}-py_0.tar.zst"
-                conda_zip.writestr(info_name, info_tar_zst)
-
-                pkg_name = f"pkg-{wheel_metadata.conda_name}-{wheel_metadata.version}-py_0.tar.zst"
-                conda_zip.write(pkg_tmp_path, pkg_name)
-
-            entry_points = wheel_metadata.console_scripts + wheel_metadata.gui_scripts
-
-        return ConversionResult(
-            path=conda_path,
-            name=wheel_metadata.conda_name,
-            version=wheel_metadata.version,
-            dependencies=dependencies,
-            extra_depends=extra_depends,
-            entry_points=entry_points,
-            subdir=wheel_metadata.conda_subdir,
-            original_requirements=wheel_metadata.dependencies,
+        return _write_conda_package(
+            pkg_tmp_path,
+            file_metadata,
+            buffered_metadata,
+            dist_info_prefix,
+            filename,
+            output_dir,
         )
     finally:
         # Cleanup temp file
@@ -2,14 +2,36 @@
 
 from __future__ import annotations
 
+import atexit
+import threading
 from pathlib import Path
 
+import httpx
 from hishel import AsyncSqliteStorage, SyncSqliteStorage
 from hishel.httpx import AsyncCacheClient, SyncCacheClient
 
 # Default cache directory
 _CACHE_DIR = Path.home() / ".cache" / "cart-wheel" / "http"
 
+# Cached responses are evicted this many seconds after they were stored,
+# which keeps the cache from growing without bound. The TTL is fixed, not
+# sliding: hishel only restarts it on a cache hit when the request sets the
+# hishel_refresh_ttl_on_access extension, which no request here does (the
+# storage's refresh_ttl_on_access argument has no effect)
+_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Connection pool of the async client, sized for the concurrent requests
+# issued when adding packages
+_ASYNC_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+# Timeouts for wheel downloads: fail fast on unreachable hosts but allow
+# slow transfers of large wheels
+_DOWNLOAD_TIMEOUT = httpx.Timeout(120.0, connect=5.0)
+
+# Connection pool of the download client, sized for the thread pool that
+# downloads and converts wheels in parallel
+_DOWNLOAD_LIMITS = httpx.Limits(max_connections=40, max_keepalive_connections=20)
+
 
 def get_client(cache_dir: Path | None = None) -> SyncCacheClient:
     """Get an HTTP client with SQLite-based caching.
@@ -17,6 +39,9 @@ def get_client(cache_dir: Path | None = None) -> SyncCacheClient:
     Uses hishel for HTTP caching which respects cache headers
     and stores responses in a SQLite database.
 
+    Requests are multiplexed over HTTP/2 when the h2 package is installed
+    (the ``http2`` extra).
+
     Args:
         cache_dir: Directory for cache storage. Defaults to ~/.cache/cart-wheel/http
 
@@ -26,8 +51,11 @@ def get_client(cache_dir: Path | None = None) -> SyncCacheClient:
     cache_path = cache_dir or _CACHE_DIR
     cache_path.mkdir(parents=True, exist_ok=True)
 
-    storage = SyncSqliteStorage(database_path=cache_path / "cache.db")
-    return SyncCacheClient(storage=storage, timeout=30.0)
+    storage = SyncSqliteStorage(
+        database_path=cache_path / "cache.db",
+        default_ttl=_CACHE_TTL,
+    )
+    return SyncCacheClient(storage=storage, timeout=30.0, http2=_http2_available())
 
 
 def get_async_client(cache_dir: Path | None = None) -> AsyncCacheClient:
@@ -36,6 +64,9 @@ def get_async_client(cache_dir: Path | None = None) -> AsyncCacheClient:
     Uses hishel for HTTP caching which respects cache headers
     and stores responses in a SQLite database.
 
+    Requests are multiplexed over HTTP/2 when the h2 package is installed
+    (the ``http2`` extra).
+
     Args:
         cache_dir: Directory for cache storage. Defaults to ~/.cache/cart-wheel/http
 
@@ -45,8 +76,25 @@ def get_async_client(cache_dir: Path | None = None) -> AsyncCacheClient:
     cache_path = cache_dir or _CACHE_DIR
     cache_path.mkdir(parents=True, exist_ok=True)
 
-    storage = AsyncSqliteStorage(database_path=cache_path / "cache.db")
-    return AsyncCacheClient(storage=storage, timeout=30.0)
+    storage = AsyncSqliteStorage(
+        database_path=cache_path / "cache.db",
+        default_ttl=_CACHE_TTL,
+    )
+    return AsyncCacheClient(
+        storage=storage,
+        timeout=30.0,
+        http2=_http2_available(),
+        limits=_ASYNC_LIMITS,
+    )
+
+
+def _http2_available() -> bool:
+    """Check whether httpx can use HTTP/2, which requires the h2 package."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
 
 # Module-level cached client (lazily initialized)
@@ -65,6 +113,31 @@ def get_cached_client() -> SyncCacheClient:
     return _client
 
 
+# Module-level download client (lazily initialized, shared across threads)
+_download_client: httpx.Client | None = None
+_download_client_lock = threading.Lock()
+
+
+def get_download_client() -> httpx.Client:
+    """Get a shared uncached HTTP client for downloading wheel files.
+
+    Wheels are large and immutable, so they bypass the HTTP cache. The
+    client keeps connections alive across downloads, so only the first
+    download from a host pays for the TCP and TLS handshakes. It is safe
+    to use from multiple threads and is closed at interpreter exit.
+    """
+    global _download_client
+    with _download_client_lock:
+        if _download_client is None:
+            _download_client = httpx.Client(
+                timeout=_DOWNLOAD_TIMEOUT,
+                limits=_DOWNLOAD_LIMITS,
+                http2=_http2_available(),
+            )
+            atexit.register(_download_client.close)
+        return _download_client
+
+
 def clear_cache(cache_dir: Path | None = None) -> None:
     """Clear the HTTP cache.
 
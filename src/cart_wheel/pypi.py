@@ -2,16 +2,17 @@
 
 from __future__ import annotations
 
+import functools
 from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-import httpx
+import orjson
 from packaging.specifiers import SpecifierSet
 from packaging.version import InvalidVersion, Version
 
-from .http import get_async_client, get_cached_client
+from .http import get_async_client, get_cached_client, get_download_client
 
 if TYPE_CHECKING:
     from collections.abc import AsyncGenerator, Generator
@@ -46,6 +47,18 @@ class PyPIError(Exception):
     """Error fetching from PyPI."""
 
 
+@functools.lru_cache(maxsize=4096)
+def _parse_version(version: str) -> Version:
+    """Parse a version string, cached across releases and packages."""
+    return Version(version)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_specifier(constraint: str) -> SpecifierSet:
+    """Parse a PEP 440 version constraint, cached per constraint string."""
+    return SpecifierSet(constraint)
+
+
 def get_package_releases(package: str) -> Generator[PyPIRelease, None, None]:
     """Yield all releases for a package from PyPI.
 
@@ -59,7 +72,7 @@ def get_package_releases(package: str) -> Generator[PyPIRelease, None, None]:
     if response.status_code == 404:
         raise PyPIError(f"Package '{package}' not found on PyPI")
     response.raise_for_status()
-    data = response.json()
+    data = orjson.loads(response.content)
 
     releases = data.get("releases", {})
 
@@ -68,7 +81,7 @@ def get_package_releases(package: str) -> Generator[PyPIRelease, None, None]:
     invalid_versions = []
     for v in releases.keys():
         try:
-            Version(v)
+            _parse_version(v)
             valid_versions.append(v)
         except InvalidVersion:
             # Skip versions that don't conform to PEP 440
@@ -86,7 +99,7 @@ def get_package_releases(package: str) -> Generator[PyPIRelease, None, None]:
 
     sorted_versions = sorted(
         valid_versions,
-        key=lambda v: Version(v),
+        key=_parse_version,
         reverse=True,
     )
 
@@ -155,7 +168,7 @@ def get_matching_versions(
     Yields:
         Releases matching the constraint, newest first
     """
-    specifier = SpecifierSet(constraint)
+    specifier = _parse_specifier(constraint)
     count = 0
 
     for release in get_package_releases(package):
@@ -164,7 +177,7 @@ def get_matching_versions(
             continue
 
         # Check if version matches constraint
-        if Version(release.version) not in specifier:
+        if _parse_version(release.version) not in specifier:
             continue
 
         yield release
@@ -184,10 +197,9 @@ def download_wheel(url: str, *, chunk_size: int = 65536) -> Iterator[bytes]:
     Yields:
         Chunks of bytes from the wheel file
     """
-    with httpx.Client() as client:
-        with client.stream("GET", url) as response:
-            response.raise_for_status()
-            yield from response.iter_bytes(chunk_size=chunk_size)
+    with get_download_client().stream("GET", url) as response:
+        response.raise_for_status()
+        yield from response.iter_bytes(chunk_size=chunk_size)
 
 
 def fetch_wheel_metadata(wheel_url: str) -> bytes | None:
@@ -268,7 +280,7 @@ def _parse_releases_response(
     invalid_versions = []
     for v in releases.keys():
         try:
-            Version(v)
+            _parse_version(v)
             valid_versions.append(v)
         except InvalidVersion:
             invalid_versions.append(v)
@@ -283,7 +295,7 @@ def _parse_releases_response(
 
     sorted_versions = sorted(
         valid_versions,
-        key=lambda v: Version(v),
+        key=_parse_version,
         reverse=True,
     )
 
@@ -355,7 +367,7 @@ async def get_package_releases_async(
     if response.status_code == 404:
         raise PyPIError(f"Package '{package}' not found on PyPI")
     response.raise_for_status()
-    data = response.json()
+    data = orjson.loads(response.content)
 
     return _parse_releases_response(data, package)
 
@@ -381,14 +393,14 @@ async def get_matching_versions_async(
         Tuple of (releases, warnings) where releases match the constraint, newest first
     """
     releases, warnings = await get_package_releases_async(package, client)
-    specifier = SpecifierSet(constraint)
+    specifier = _parse_specifier(constraint)
 
     result = []
     for release in releases:
         if release.yanked and not include_yanked:
             continue
 
-        if Version(release.version) not in specifier:
+        if _parse_version(release.version) not in specifier:
             continue
 
         result.append(release)
@@ -453,12 +465,9 @@ def download_wheel_streaming(url: str) -> Iterable[bytes]:
     Yields:
         Chunks of bytes from the wheel file
     """
-    import httpx
-
-    with httpx.Client(timeout=120.0) as client:
-        with client.stream("GET", url) as response:
-            response.raise_for_status()
-            yield from response.iter_bytes(chunk_size=65536)
+    with get_download_client().stream("GET", url) as response:
+        response.raise_for_status()
+        yield from response.iter_bytes(chunk_size=65536)
 
 
 async def download_wheel_streaming_async(url: str) -> "AsyncGenerator[bytes, None]":
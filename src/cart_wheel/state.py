@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-import json
+import contextlib
+import hashlib
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
@@ -10,11 +11,16 @@ from typing import TYPE_CHECKING, Literal
 
 import tomllib
 
+import orjson
 from packaging.utils import parse_wheel_filename
 
 if TYPE_CHECKING:
     pass
 
+# Default directory for the cached wheel status counts of each state dir,
+# kept out of the state dir so the status command never writes to it
+DEFAULT_STATUS_CACHE_DIR = Path.home() / ".cache" / "cart-wheel" / "status"
+
 
 def _extract_version_from_filename(filename: str) -> str:
     """Extract version from wheel filename using packaging library."""
@@ -195,8 +201,8 @@ def load_state(state_dir: Path, name: str) -> dict[str, WheelState]:
     if not state_path.exists():
         return {}
 
-    with open(state_path) as f:
-        data = json.load(f)
+    with open(state_path, "rb") as f:
+        data = orjson.loads(f.read())
 
     return {filename: WheelState.from_dict(state) for filename, state in data.items()}
 
@@ -216,13 +222,96 @@ def save_state(state_dir: Path, name: str, state: dict[str, WheelState]) -> None
     data = {filename: ws.to_dict() for filename, ws in state.items()}
 
     # Write to temp file first
-    with open(temp_path, "w") as f:
-        json.dump(data, f, indent=2)
+    with open(temp_path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
     # Atomic rename
     temp_path.replace(state_path)
 
 
+def load_status_counts(
+    state_dir: Path, names: list[str], cache_dir: Path | None = None
+) -> dict[str, dict[str, int]]:
+    """Count the wheels of each package by status.
+
+    With a cache_dir, counts are cached there per state dir and reused while
+    a package's state file keeps the same mtime and size, so only state
+    files that changed since the last call are parsed. Malformed cache
+    entries are treated as misses, and failing to write the cache is not
+    an error.
+
+    Args:
+        state_dir: Directory containing state files
+        names: Package names to count
+        cache_dir: Directory for the counts cache, or None to not cache
+
+    Returns:
+        Dict mapping package name to a dict of status to wheel count
+    """
+    index: dict = {}
+    index_path = None
+    if cache_dir is not None:
+        index_path = _status_index_path(state_dir, cache_dir)
+        try:
+            with open(index_path, "rb") as f:
+                index = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            pass
+        if not isinstance(index, dict):
+            index = {}
+
+    counts: dict[str, dict[str, int]] = {}
+    new_index: dict[str, dict] = {}
+    for name in names:
+        try:
+            stat = (state_dir / f"{name}.json").stat()
+        except OSError:
+            counts[name] = {}
+            continue
+
+        key = [stat.st_mtime_ns, stat.st_size]
+        entry = index.get(name)
+        if not _is_valid_status_entry(entry, key):
+            package_counts: dict[str, int] = {}
+            for ws in load_state(state_dir, name).values():
+                package_counts[ws.status] = package_counts.get(ws.status, 0) + 1
+            entry = {"key": key, "counts": package_counts}
+
+        counts[name] = entry["counts"]
+        new_index[name] = entry
+
+    if index_path is not None and new_index != index:
+        temp_path = index_path.with_suffix(".json.tmp")
+        try:
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(orjson.dumps(new_index))
+            temp_path.replace(index_path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                temp_path.unlink(missing_ok=True)
+
+    return counts
+
+
+def _status_index_path(state_dir: Path, cache_dir: Path) -> Path:
+    """Locate the status counts cache of a state dir in the cache directory."""
+    key = str(state_dir.resolve()).encode()
+    digest = hashlib.blake2b(key, digest_size=16).hexdigest()
+    return cache_dir / f"{digest}.json"
+
+
+def _is_valid_status_entry(entry: object, key: list[int]) -> bool:
+    """Check that a cached entry is well-formed and matches the state file."""
+    if not isinstance(entry, dict) or entry.get("key") != key:
+        return False
+    counts = entry.get("counts")
+    return isinstance(counts, dict) and all(
+        isinstance(status, str) and isinstance(count, int)
+        for status, count in counts.items()
+    )
+
+
 def validate_dependencies(
     deps: Dependencies,
     packages: list[str],
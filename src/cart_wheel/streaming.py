@@ -38,14 +38,18 @@ class StreamingTarZstWriter:
     Uses tarfile streaming mode and zstd stream compression.
     """
 
-    def __init__(self, output: BinaryIO, compression_level: int = 19):
+    def __init__(
+        self, output: BinaryIO, compression_level: int = 19, threads: int = -1
+    ):
         """Initialize the streaming writer.
 
         Args:
             output: File-like object to write compressed data to.
             compression_level: Zstandard compression level (1-22, default 19).
+            threads: Number of zstd worker threads compressing in the
+                background (-1 for one per CPU, 0 to compress inline).
         """
-        self._cctx = zstd.ZstdCompressor(level=compression_level)
+        self._cctx = zstd.ZstdCompressor(level=compression_level, threads=threads)
         self._compressor = self._cctx.stream_writer(output)
         self._tar = tarfile.open(fileobj=self._compressor, mode="w|")
         self._files: list[FileMetadata] = []
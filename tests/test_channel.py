@@ -2,15 +2,27 @@
 
 from __future__ import annotations
 
+import asyncio
 import io
 import json
+import os
+import sqlite3
 import tarfile
+import threading
 import zipfile
 from pathlib import Path
 
+import pytest
 import zstandard as zstd
 
-from cart_wheel.channel import index_channel
+from cart_wheel import channel
+from cart_wheel.channel import (
+    aindex_channel,
+    index_channel,
+    index_channels,
+    prune_channel,
+    train_repodata_dictionary,
+)
 
 
 def _create_test_conda_package(
@@ -153,3 +165,525 @@ def test_index_channel_creates_compressed_repodata(tmp_path: Path):
 
     repodata_zst = noarch_dir / "repodata.json.zst"
     assert repodata_zst.exists()
+
+
+def test_index_channel_compresses_created_noarch(tmp_path: Path):
+    """Should compress repodata for a noarch subdir created by indexing."""
+    channel_dir = tmp_path / "channel"
+    linux_dir = channel_dir / "linux-64"
+    linux_dir.mkdir(parents=True)
+
+    _create_test_conda_package(linux_dir)
+
+    index_channel(channel_dir)
+
+    assert (linux_dir / "repodata.json.zst").exists()
+    assert (channel_dir / "noarch" / "repodata.json.zst").exists()
+
+
+def test_index_channel_restores_missing_compressed_repodata(tmp_path: Path):
+    """Should rewrite a deleted repodata.json.zst of an unchanged subdir."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    cache_dir = tmp_path / "cache"
+
+    _create_test_conda_package(noarch_dir)
+
+    index_channel(channel_dir, cache_dir=cache_dir)
+    (noarch_dir / "repodata.json.zst").unlink()
+    index_channel(channel_dir, cache_dir=cache_dir)
+
+    repodata = (noarch_dir / "repodata.json").read_bytes()
+    compressed = (noarch_dir / "repodata.json.zst").read_bytes()
+    assert zstd.ZstdDecompressor().decompress(compressed) == repodata
+
+
+def test_index_channel_indexes_platform_subdirs(tmp_path: Path):
+    """Should write repodata.json for every platform subdir."""
+    channel_dir = tmp_path / "channel"
+    (channel_dir / "noarch").mkdir(parents=True)
+    linux_dir = channel_dir / "linux-64"
+    linux_dir.mkdir()
+
+    _create_test_conda_package(linux_dir, name="linux-pkg")
+
+    index_channel(channel_dir)
+
+    assert (channel_dir / "noarch" / "repodata.json").exists()
+    with open(linux_dir / "repodata.json") as f:
+        repodata = json.load(f)
+    assert "linux-pkg-1.0.0-py_0.conda" in repodata["packages.conda"]
+
+
+def test_index_channel_skips_unchanged_subdirs(tmp_path: Path, monkeypatch):
+    """Should only re-index subdirs whose packages changed since the last run."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    linux_dir = channel_dir / "linux-64"
+    linux_dir.mkdir()
+
+    _create_test_conda_package(noarch_dir, name="pkg-a")
+    _create_test_conda_package(linux_dir, name="pkg-b")
+    cache_dir = tmp_path / "cache"
+
+    index_channel(channel_dir, cache_dir=cache_dir)
+
+    indexed: list[str] = []
+    original_index_fs = channel.index_fs
+
+    async def recording_index_fs(**kwargs):
+        indexed.append(str(kwargs["target_platform"]))
+        await original_index_fs(**kwargs)
+
+    monkeypatch.setattr(channel, "index_fs", recording_index_fs)
+
+    index_channel(channel_dir, cache_dir=cache_dir)
+    assert indexed == []
+
+    _create_test_conda_package(linux_dir, name="pkg-c")
+    index_channel(channel_dir, cache_dir=cache_dir)
+    assert indexed == ["linux-64"]
+
+    with open(linux_dir / "repodata.json") as f:
+        repodata = json.load(f)
+    assert "pkg-c-1.0.0-py_0.conda" in repodata["packages.conda"]
+
+
+def test_index_channel_keeps_manifest_out_of_channel(tmp_path: Path):
+    """Should write the index manifest to the cache dir, not the channel."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    cache_dir = tmp_path / "cache"
+
+    _create_test_conda_package(noarch_dir)
+
+    index_channel(channel_dir, cache_dir=cache_dir)
+
+    assert [p.name for p in channel_dir.glob("*.json")] == []
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+
+def test_index_channel_empty_channel(tmp_path: Path):
+    """Should write noarch repodata for a channel without any subdirs."""
+    channel_dir = tmp_path / "channel"
+    channel_dir.mkdir()
+
+    index_channel(channel_dir)
+
+    assert (channel_dir / "noarch" / "repodata.json").exists()
+    assert (channel_dir / "noarch" / "repodata.json.zst").exists()
+
+
+def test_index_channel_reindexes_when_repodata_missing(tmp_path: Path):
+    """Should re-index a subdir whose repodata.json was removed."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    _create_test_conda_package(noarch_dir)
+
+    index_channel(channel_dir)
+    (noarch_dir / "repodata.json").unlink()
+    index_channel(channel_dir)
+
+    assert (noarch_dir / "repodata.json").exists()
+
+
+def test_index_channel_writes_sharded_repodata(tmp_path: Path):
+    """Should write the shard index and shards when asked to."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    _create_test_conda_package(noarch_dir)
+
+    index_channel(channel_dir, write_shards=True)
+
+    assert (noarch_dir / "repodata_shards.msgpack.zst").exists()
+    assert list((noarch_dir / "shards").glob("*.msgpack.zst"))
+
+
+def test_index_channel_without_shards(tmp_path: Path):
+    """Should not write sharded repodata by default."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    _create_test_conda_package(noarch_dir)
+
+    index_channel(channel_dir)
+
+    assert (noarch_dir / "repodata.json").exists()
+    assert not (noarch_dir / "repodata_shards.msgpack.zst").exists()
+
+
+def test_index_channel_removes_stale_shards(tmp_path: Path):
+    """Should keep only the shards referenced by the current shard index."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    for version in ["1.0.0", "2.0.0", "3.0.0"]:
+        _create_test_conda_package(noarch_dir, version=version)
+        index_channel(channel_dir, write_shards=True)
+
+    assert len(list((noarch_dir / "shards").glob("*.msgpack.zst"))) == 1
+
+
+def test_index_channels_indexes_every_channel(tmp_path: Path):
+    """Should index each of the given channels."""
+    channel_dirs = [tmp_path / "channel-a", tmp_path / "channel-b"]
+    for channel_dir in channel_dirs:
+        noarch_dir = channel_dir / "noarch"
+        noarch_dir.mkdir(parents=True)
+        _create_test_conda_package(noarch_dir, name=channel_dir.name)
+
+    index_channels(channel_dirs)
+
+    for channel_dir in channel_dirs:
+        with open(channel_dir / "noarch" / "repodata.json") as f:
+            repodata = json.load(f)
+        assert f"{channel_dir.name}-1.0.0-py_0.conda" in repodata["packages.conda"]
+
+
+def test_prune_channel_keeps_newest_versions(tmp_path: Path):
+    """Should remove all but the newest versions of each package."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    for version in ["1.0.0", "1.9.0", "1.10.0"]:
+        _create_test_conda_package(noarch_dir, name="pkg-a", version=version)
+    _create_test_conda_package(noarch_dir, name="pkg-b", version="1.0.0")
+
+    removed = prune_channel(channel_dir, tmp_path / "state", keep_versions=2)
+
+    assert removed == [noarch_dir / "pkg-a-1.0.0-py_0.conda"]
+    assert not removed[0].exists()
+    assert sorted(p.name for p in noarch_dir.glob("*.conda")) == [
+        "pkg-a-1.10.0-py_0.conda",
+        "pkg-a-1.9.0-py_0.conda",
+        "pkg-b-1.0.0-py_0.conda",
+    ]
+
+
+def test_prune_channel_tracks_new_packages(tmp_path: Path):
+    """Should pick up packages added after a previous prune."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    state_dir = tmp_path / "state"
+
+    _create_test_conda_package(noarch_dir, version="1.0.0")
+    assert prune_channel(channel_dir, state_dir, keep_versions=1) == []
+    assert (state_dir / "packages.sqlite").exists()
+
+    _create_test_conda_package(noarch_dir, version="2.0.0")
+    removed = prune_channel(channel_dir, state_dir, keep_versions=1)
+
+    assert removed == [noarch_dir / "test-pkg-1.0.0-py_0.conda"]
+    assert prune_channel(channel_dir, state_dir, keep_versions=1) == []
+
+
+def test_prune_channel_skips_unparsable_versions(tmp_path: Path):
+    """Should leave files with an unparsable version alone."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    for version in ["1.0.0", "2.0.0"]:
+        _create_test_conda_package(noarch_dir, name="p", version=version)
+    bad_path = noarch_dir / "p-1.0$$bad-py_0.conda"
+    bad_path.write_bytes(b"")
+
+    removed = prune_channel(channel_dir, tmp_path / "state", keep_versions=1)
+
+    assert removed == [noarch_dir / "p-1.0.0-py_0.conda"]
+    assert bad_path.exists()
+
+
+def test_prune_channel_commits_before_removing_files(tmp_path: Path, monkeypatch):
+    """Should only remove files once the database no longer tracks them."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    state_dir = tmp_path / "state"
+
+    for version in ["1.0.0", "2.0.0"]:
+        _create_test_conda_package(noarch_dir, version=version)
+
+    tracked_at_unlink: list[list[str]] = []
+    original_unlink = Path.unlink
+
+    def recording_unlink(self, missing_ok=False):
+        with sqlite3.connect(state_dir / "packages.sqlite") as conn:
+            tracked_at_unlink.append(
+                [row[0] for row in conn.execute("SELECT filename FROM packages")]
+            )
+        original_unlink(self, missing_ok=missing_ok)
+
+    monkeypatch.setattr(Path, "unlink", recording_unlink)
+    prune_channel(channel_dir, state_dir, keep_versions=1)
+
+    assert tracked_at_unlink == [["test-pkg-2.0.0-py_0.conda"]]
+
+
+def test_index_channel_ignores_touched_packages(tmp_path: Path, monkeypatch):
+    """Should not re-index a subdir when only package mtimes changed."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    package_path = _create_test_conda_package(noarch_dir)
+    cache_dir = tmp_path / "cache"
+    index_channel(channel_dir, cache_dir=cache_dir)
+
+    indexed: list[str] = []
+
+    async def recording_index_fs(**kwargs):
+        indexed.append(str(kwargs["target_platform"]))
+
+    monkeypatch.setattr(channel, "index_fs", recording_index_fs)
+
+    stat = package_path.stat()
+    os.utime(package_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    index_channel(channel_dir, cache_dir=cache_dir)
+
+    assert indexed == []
+
+
+def _write_fake_repodata(subdir_path: Path, count: int) -> None:
+    """Write a repodata.json with count synthetic package records."""
+    subdir_path.mkdir(parents=True, exist_ok=True)
+    packages = {
+        f"pkg-{i}-1.0.0-py_0.conda": {
+            "name": f"pkg-{i}",
+            "version": "1.0.0",
+            "build": "py_0",
+            "build_number": 0,
+            "depends": ["python >=3.8"],
+            "sha256": f"{i:064x}",
+            "size": 1000 + i,
+        }
+        for i in range(count)
+    }
+    repodata = {"info": {"subdir": subdir_path.name}, "packages.conda": packages}
+    (subdir_path / "repodata.json").write_text(json.dumps(repodata))
+
+
+def test_train_repodata_dictionary(tmp_path: Path):
+    """Should train a dictionary from the package records in repodata.json."""
+    channel_dir = tmp_path / "channel"
+    _write_fake_repodata(channel_dir / "noarch", count=50)
+
+    zstd_dict = train_repodata_dictionary(channel_dir, dict_size=4096)
+
+    assert 0 < len(zstd_dict) <= 4096
+
+
+def test_index_channel_compresses_with_dictionary(tmp_path: Path):
+    """Should write dictionary-compressed repodata next to the standard file."""
+    training_dir = tmp_path / "training"
+    _write_fake_repodata(training_dir / "noarch", count=50)
+    zstd_dict = train_repodata_dictionary(training_dir, dict_size=4096)
+
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    cache_dir = tmp_path / "cache"
+
+    _create_test_conda_package(noarch_dir, version="1.0.0")
+    index_channel(channel_dir, cache_dir=cache_dir)
+    _create_test_conda_package(noarch_dir, version="2.0.0")
+    index_channel(channel_dir, zstd_dict=zstd_dict, cache_dir=cache_dir)
+
+    repodata = (noarch_dir / "repodata.json").read_bytes()
+    assert b"test-pkg-2.0.0-py_0.conda" in repodata
+
+    standard = (noarch_dir / "repodata.json.zst").read_bytes()
+    assert zstd.ZstdDecompressor().decompress(standard) == repodata
+
+    compressed = (noarch_dir / "repodata.json.dict.zst").read_bytes()
+    dctx = zstd.ZstdDecompressor(dict_data=zstd.ZstdCompressionDict(zstd_dict))
+    assert dctx.decompress(compressed) == repodata
+
+
+def test_index_channel_recompresses_when_settings_change(tmp_path: Path, monkeypatch):
+    """Should recompress unchanged subdirs when the compression settings change."""
+    training_dir = tmp_path / "training"
+    _write_fake_repodata(training_dir / "noarch", count=50)
+    zstd_dict = train_repodata_dictionary(training_dir, dict_size=4096)
+
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    cache_dir = tmp_path / "cache"
+    _create_test_conda_package(noarch_dir)
+
+    compressed: list[int] = []
+    original_compress = channel._compress_repodata
+
+    def recording_compress(subdir_path, compression_level, zstd_dict):
+        compressed.append(compression_level)
+        original_compress(subdir_path, compression_level, zstd_dict)
+
+    monkeypatch.setattr(channel, "_compress_repodata", recording_compress)
+
+    index_channel(channel_dir, zstd_dict=zstd_dict, cache_dir=cache_dir)
+    index_channel(channel_dir, zstd_dict=zstd_dict, cache_dir=cache_dir)
+    assert compressed == [19]
+
+    index_channel(channel_dir, cache_dir=cache_dir)
+    assert not (noarch_dir / "repodata.json.dict.zst").exists()
+
+    index_channel(channel_dir, compression_level=3, cache_dir=cache_dir)
+    assert compressed == [19, 19, 3]
+
+    repodata = (noarch_dir / "repodata.json").read_bytes()
+    standard = (noarch_dir / "repodata.json.zst").read_bytes()
+    assert zstd.ZstdDecompressor().decompress(standard) == repodata
+
+
+def test_index_channel_compressed_repodata_matches_json(tmp_path: Path):
+    """repodata.json.zst should decompress to repodata.json."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    _create_test_conda_package(noarch_dir)
+
+    index_channel(channel_dir, compression_level=3)
+
+    compressed = (noarch_dir / "repodata.json.zst").read_bytes()
+    decompressed = zstd.ZstdDecompressor().decompress(compressed)
+    assert decompressed == (noarch_dir / "repodata.json").read_bytes()
+
+
+def test_index_channel_repodata_packages_are_sorted(tmp_path: Path):
+    """Package records should be sorted by filename for better compression."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    for name in ["zeta", "alpha", "mid"]:
+        _create_test_conda_package(noarch_dir, name=name)
+
+    index_channel(channel_dir)
+
+    with open(noarch_dir / "repodata.json") as f:
+        filenames = list(json.load(f)["packages.conda"])
+    assert filenames == sorted(filenames)
+
+
+def test_aindex_channel_creates_repodata_json(tmp_path: Path):
+    """Should index the channel from within a running event loop."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+
+    _create_test_conda_package(noarch_dir)
+
+    asyncio.run(aindex_channel(channel_dir))
+
+    assert (noarch_dir / "repodata.json").exists()
+
+
+def test_index_channel_rejects_running_loop(tmp_path: Path):
+    """Should point to aindex_channel when called from a running loop."""
+    channel_dir = tmp_path / "channel"
+    (channel_dir / "noarch").mkdir(parents=True)
+
+    async def call_sync_api() -> None:
+        index_channel(channel_dir)
+
+    with pytest.raises(RuntimeError, match="aindex_channel"):
+        asyncio.run(call_sync_api())
+
+
+def test_index_channel_reuses_event_loop(tmp_path: Path):
+    """Should run successive calls on the same cached event loop."""
+    first_dir = tmp_path / "first" / "noarch"
+    second_dir = tmp_path / "second" / "noarch"
+    first_dir.mkdir(parents=True)
+    second_dir.mkdir(parents=True)
+    _create_test_conda_package(first_dir)
+    _create_test_conda_package(second_dir)
+
+    index_channel(first_dir.parent)
+    loop = channel._get_loop()
+    index_channel(second_dir.parent)
+
+    assert channel._get_loop() is loop
+    assert not loop.is_closed()
+    assert (second_dir / "repodata.json").exists()
+
+
+def test_index_channel_fresh_loop(tmp_path: Path):
+    """Should index the channel on a new event loop when asked to."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    _create_test_conda_package(noarch_dir)
+
+    index_channel(channel_dir, fresh_loop=True)
+
+    assert (noarch_dir / "repodata.json").exists()
+
+
+def test_index_channel_fresh_loop_is_closed(tmp_path: Path, monkeypatch):
+    """Should close the fresh event loop once indexing is done."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    _create_test_conda_package(noarch_dir)
+
+    loops: list[asyncio.AbstractEventLoop] = []
+    original_new_loop = channel._new_loop
+
+    def recording_new_loop():
+        loops.append(original_new_loop())
+        return loops[-1]
+
+    monkeypatch.setattr(channel, "_new_loop", recording_new_loop)
+
+    index_channel(channel_dir, fresh_loop=True)
+
+    assert len(loops) == 1
+    assert loops[0].is_closed()
+
+
+def test_index_channel_closes_cached_loop_with_thread(tmp_path: Path):
+    """Should close a worker thread's cached event loop when the thread exits."""
+    channel_dir = tmp_path / "channel"
+    noarch_dir = channel_dir / "noarch"
+    noarch_dir.mkdir(parents=True)
+    _create_test_conda_package(noarch_dir)
+
+    loops: list[asyncio.AbstractEventLoop] = []
+
+    def worker() -> None:
+        index_channel(channel_dir)
+        loops.append(channel._get_loop())
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert loops[0].is_closed()
+
+
+def test_cached_loop_closes_without_new_threads(monkeypatch):
+    """Should close a cached loop without starting threads, as at exit."""
+    cached = channel._CachedLoop()
+    cached.loop.run_until_complete(asyncio.to_thread(int))
+
+    def refuse_start(self):
+        raise RuntimeError("can't create new thread at interpreter shutdown")
+
+    monkeypatch.setattr(threading.Thread, "start", refuse_start)
+    cached.finalizer()
+
+    assert cached.loop.is_closed()
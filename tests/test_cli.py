@@ -1,10 +1,26 @@
 """Tests for CLI functionality."""
 
+import asyncio
+import subprocess
+import sys
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-
-from cart_wheel.cli import main
+from rich.console import Console
+
+from cart_wheel import cli
+from cart_wheel.channel import DEFAULT_COMPRESSION_LEVEL
+from cart_wheel.cli import (
+    _add_packages_async,
+    _fetch_package_info_async,
+    _parse_dep,
+    _write_packages_async,
+    main,
+)
+from cart_wheel.pypi import PyPIRelease, WheelInfo
 
 # Basic CLI tests
 
@@ -211,3 +227,230 @@ def test_cli_unsupported_marker_error(tmp_wheel, tmp_path: Path, capsys):
     captured = capsys.readouterr()
     assert "Error:" in captured.err
     assert "platform_machine" in captured.err
+
+
+def test_cli_train_dict_missing_channel_error(tmp_path: Path, capsys):
+    """Training a dictionary for a missing channel returns error."""
+    result = main(["train-dict", "--output-dir", str(tmp_path / "missing")])
+
+    assert result == 1
+    captured = capsys.readouterr()
+    assert "not found" in captured.err
+
+
+def test_cli_index_uses_channel_defaults(tmp_path: Path, capsys):
+    """The index command falls back to the documented channel defaults."""
+    with patch("cart_wheel.channel.index_channel") as index_channel:
+        result = main(["index", "--output-dir", str(tmp_path)])
+
+    assert result == 0
+    kwargs = index_channel.call_args.kwargs
+    assert kwargs["compression_level"] == DEFAULT_COMPRESSION_LEVEL
+
+    with pytest.raises(SystemExit):
+        main(["index", "--help"])
+    assert f"(default: {DEFAULT_COMPRESSION_LEVEL})" in capsys.readouterr().out
+
+
+def test_cli_import_is_lazy():
+    """Importing the CLI does not load the indexer or asyncio."""
+    code = (
+        "import sys, cart_wheel.cli; "
+        "print('rattler' in sys.modules, 'asyncio' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.split() == ["False", "False"]
+
+
+@pytest.mark.parametrize(
+    ("dep", "expected"),
+    [
+        ("Typing_Extensions>=4.0", ("typing-extensions", True)),
+        ("tomli; python_version < '3.11'", ("tomli", True)),
+        ("pytest; extra == 'test'", ("pytest", False)),
+        ("coverage; python_version >= '3.8' and (extra == 'test')", ("coverage", False)),
+        ("pywin32; os_name == 'extra'", ("pywin32", True)),
+    ],
+)
+def test_parse_dep(dep: str, expected: tuple[str, bool]):
+    """Dependencies are normalized and extras are marked optional."""
+    assert _parse_dep(dep) == expected
+
+
+def test_fetch_package_info_async_fetches_metadata_once_per_url():
+    """Wheels sharing a URL only have their metadata fetched once."""
+    wheel = WheelInfo(
+        filename="example-1.0-py3-none-any.whl",
+        url="https://files.example/example-1.0-py3-none-any.whl",
+        python_requires=None,
+        sha256="abc123",
+        size=100,
+    )
+    releases = [
+        PyPIRelease(
+            version=version,
+            upload_time=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            wheels=[wheel],
+            yanked=False,
+        )
+        for version in ("1.0", "1.0.post0")
+    ]
+    fetch_metadata = AsyncMock(return_value=b"Requires-Dist: requests\n")
+
+    with (
+        patch(
+            "cart_wheel.pypi.get_matching_versions_async",
+            AsyncMock(return_value=(releases, [])),
+        ),
+        patch("cart_wheel.pypi.fetch_wheel_metadata_async", fetch_metadata),
+    ):
+        info = asyncio.run(_fetch_package_info_async("example", "", 5, MagicMock()))
+
+    assert fetch_metadata.await_count == 1
+    assert info.wheel_dependencies == {wheel.filename: ["requests"]}
+    assert info.wheel_required_deps == {wheel.filename: ["requests"]}
+    assert info.required_deps == {"requests"}
+
+
+def _package_info(name: str, **fields) -> cli.PackageInfo:
+    """Create a PackageInfo without wheels or dependencies."""
+    defaults = {
+        "name": name,
+        "original_name": name,
+        "constraint": "",
+        "wheels": [],
+        "wheel_dependencies": {},
+        "required_deps": set(),
+        "optional_deps": set(),
+    }
+    return cli.PackageInfo(**{**defaults, **fields})
+
+
+def _fake_fetch(
+    graph: dict[str, set[str]], overrides: dict[str, dict] | None = None
+):
+    """Create a _fetch_single_package stand-in that walks a dependency graph.
+
+    Args:
+        graph: Required dependencies of each package
+        overrides: Extra PackageInfo fields for specific packages
+    """
+
+    async def fake_fetch(package, constraint, max_versions, client, required_by=None):
+        info = _package_info(
+            package,
+            constraint=constraint,
+            required_deps=graph.get(package, set()),
+            required_by=required_by,
+            **(overrides or {}).get(package, {}),
+        )
+        return cli._FetchResult(info=info, conda_name=None)
+
+    return fake_fetch
+
+
+def test_add_packages_async_walks_dependencies(tmp_path: Path):
+    """Dependencies are fetched once each and sorted by outcome."""
+    fake_fetch = _fake_fetch(
+        {"app": {"lib", "shared"}, "lib": {"shared", "native"}},
+        {"native": {"error": "No pure Python wheels found"}},
+    )
+
+    with patch.object(cli, "_fetch_single_package", fake_fetch):
+        to_add, needs_input, _ = asyncio.run(
+            _add_packages_async(
+                "app", "", 5, tmp_path, False, Console(quiet=True), client=MagicMock()
+            )
+        )
+
+    assert sorted(info.name for info in to_add) == ["app", "lib", "shared"]
+    assert [(info.name, info.required_by) for info in needs_input] == [("native", "lib")]
+
+
+def test_add_packages_async_survives_result_errors(tmp_path: Path):
+    """A package whose result cannot be handled does not stop the workers."""
+    # Warnings of None make handle_result raise
+    fake_fetch = _fake_fetch({"app": {"bad", "lib"}}, {"bad": {"warnings": None}})
+
+    with (
+        patch.object(cli, "_fetch_single_package", fake_fetch),
+        patch.object(cli, "_MAX_CONCURRENT_REQUESTS", 1),
+    ):
+        to_add, needs_input, _ = asyncio.run(
+            asyncio.wait_for(
+                _add_packages_async(
+                    "app", "", 5, tmp_path, False, Console(quiet=True), client=MagicMock()
+                ),
+                timeout=5,
+            )
+        )
+
+    assert sorted(info.name for info in to_add) == ["app", "lib"]
+    assert needs_input == []
+
+
+def test_write_packages_async_writes_all_packages(tmp_path: Path):
+    """Config files are written for regular and empty packages."""
+    packages_dir = tmp_path / "packages"
+    state_dir = tmp_path / "state"
+    packages_dir.mkdir()
+    state_dir.mkdir()
+    info = _package_info("mapped", conda_forge="mapped-cf")
+
+    asyncio.run(
+        _write_packages_async(
+            [info], ["native"], packages_dir, state_dir, Console(quiet=True)
+        )
+    )
+
+    assert 'conda_forge = "mapped-cf"' in (packages_dir / "mapped.toml").read_text()
+    assert (packages_dir / "native.toml").exists()
+    assert (state_dir / "native.json").read_text() == "{}\n"
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_cli_add_dry_run(tmp_path: Path, capsys):
+    """A dry run lists the package and its dependencies without writing."""
+    fake_fetch = _fake_fetch({"app": {"lib"}})
+    packages_dir = tmp_path / "packages"
+    with (
+        patch.object(cli, "_fetch_single_package", fake_fetch),
+        patch("cart_wheel.http.get_async_client", MagicMock()),
+    ):
+        result = main(
+            ["add", "app", "--packages-dir", str(packages_dir), "--dry-run"]
+        )
+
+    assert result == 0
+    captured = capsys.readouterr()
+    assert "Would add 2 package(s)" in captured.out
+    assert not packages_dir.exists()
+
+
+def test_cli_add_prompts_off_the_event_loop(tmp_path: Path):
+    """Packages needing input are prompted on a worker thread."""
+    fake_fetch = _fake_fetch(
+        {"app": {"native"}}, {"native": {"error": "No pure Python wheels found"}}
+    )
+    prompt_threads = []
+
+    def fake_prompt(info, console):
+        prompt_threads.append(threading.get_ident())
+        return "empty", None
+
+    with (
+        patch.object(cli, "_fetch_single_package", fake_fetch),
+        patch.object(cli, "_prompt_for_package", fake_prompt),
+        patch.object(cli.sys, "stdin", MagicMock(isatty=lambda: True)),
+        patch("cart_wheel.http.get_async_client", MagicMock()),
+    ):
+        result = main(
+            ["add", "app", "--packages-dir", str(tmp_path / "packages"), "--dry-run"]
+        )
+
+    assert result == 0
+    assert prompt_threads
+    assert threading.get_ident() not in prompt_threads
@@ -1,5 +1,6 @@
 """Tests for conda package building functionality."""
 
+import asyncio
 import hashlib
 import io
 import json
@@ -13,9 +14,9 @@ from packaging.requirements import Requirement
 
 from cart_wheel.conda import (
     ConversionResult,
-    _create_tar_zst,
     _requirement_to_conda_dep,
     convert_wheel,
+    convert_wheel_async,
 )
 
 # Helper functions
@@ -31,8 +32,10 @@ def _extract_info_file(conda_path: Path, filename: str) -> bytes:
         else:
             raise ValueError("No info archive found")
 
+    # Use streaming decompression (streaming compression doesn't include size in header)
     dctx = zstd.ZstdDecompressor()
-    info_tar = dctx.decompress(info_zst)
+    with dctx.stream_reader(io.BytesIO(info_zst)) as reader:
+        info_tar = reader.read()
 
     with tarfile.open(fileobj=io.BytesIO(info_tar)) as tar:
         member = tar.extractfile(filename)
@@ -63,64 +66,6 @@ def _extract_pkg_file(conda_path: Path, filename: str) -> bytes:
         return member.read()
 
 
-# _create_tar_zst tests
-
-
-def test_create_tar_zst_valid_zstd():
-    """Output is valid zstd-compressed tar."""
-    files = {"test.txt": b"hello world"}
-    result = _create_tar_zst(files)
-
-    dctx = zstd.ZstdDecompressor()
-    decompressed = dctx.decompress(result)
-
-    with tarfile.open(fileobj=io.BytesIO(decompressed)) as tar:
-        assert "test.txt" in tar.getnames()
-
-
-def test_create_tar_zst_multiple_files():
-    """Multiple files are included in archive."""
-    files = {
-        "file1.txt": b"content1",
-        "file2.txt": b"content2",
-        "dir/file3.txt": b"content3",
-    }
-    result = _create_tar_zst(files)
-
-    dctx = zstd.ZstdDecompressor()
-    decompressed = dctx.decompress(result)
-
-    with tarfile.open(fileobj=io.BytesIO(decompressed)) as tar:
-        names = tar.getnames()
-        assert "file1.txt" in names
-        assert "file2.txt" in names
-        assert "dir/file3.txt" in names
-
-
-def test_create_tar_zst_content_preserved():
-    """Binary content is preserved exactly."""
-    content = b"test content with special chars: \x00\xff"
-    files = {"test.bin": content}
-    result = _create_tar_zst(files)
-
-    dctx = zstd.ZstdDecompressor()
-    decompressed = dctx.decompress(result)
-
-    with tarfile.open(fileobj=io.BytesIO(decompressed)) as tar:
-        extracted = tar.extractfile("test.bin")
-        assert extracted.read() == content
-
-
-def test_create_tar_zst_empty_dict():
-    """Empty input creates valid empty archive."""
-    result = _create_tar_zst({})
-    dctx = zstd.ZstdDecompressor()
-    decompressed = dctx.decompress(result)
-
-    with tarfile.open(fileobj=io.BytesIO(decompressed)) as tar:
-        assert tar.getnames() == []
-
-
 # _requirement_to_conda_dep tests
 
 
@@ -603,3 +548,21 @@ def test_convert_wheel_requires_filename_for_iterable(
 
     with pytest.raises(ValueError, match="filename is required"):
         convert_wheel(read_chunks(), output_dir)
+
+
+def test_convert_wheel_async_matches_sync(sample_wheel: Path, tmp_path: Path):
+    """convert_wheel_async produces the same package files as convert_wheel."""
+
+    async def read_chunks():
+        with open(sample_wheel, "rb") as f:
+            while chunk := f.read(65536):
+                yield chunk
+
+    sync_result = convert_wheel(sample_wheel, tmp_path / "sync")
+    async_result = asyncio.run(
+        convert_wheel_async(read_chunks(), tmp_path / "async", sample_wheel.name)
+    )
+
+    assert _extract_info_file(async_result.path, "info/paths.json") == _extract_info_file(
+        sync_result.path, "info/paths.json"
+    )
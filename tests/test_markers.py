@@ -132,6 +132,19 @@ def test_marker_to_condition_unsupported_raises():
     assert "platform_machine" in str(exc_info.value)
 
 
+def test_marker_to_condition_platform_not_equal():
+    """Negated platform markers become negated platform flags."""
+    marker = Marker("platform_system != 'Windows'")
+    assert _marker_to_condition(marker) == "not __win"
+
+
+def test_marker_to_condition_unknown_platform_raises():
+    """Unknown platform values raise DependencyConversionError."""
+    marker = Marker("sys_platform == 'emscripten'")
+    with pytest.raises(DependencyConversionError, match="Unknown sys_platform value"):
+        _marker_to_condition(marker)
+
+
 # _extract_extra_from_marker tests
 
 
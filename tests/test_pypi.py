@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from unittest.mock import MagicMock, patch
 
+import orjson
 import pytest
 
 from cart_wheel.pypi import (
@@ -73,7 +74,7 @@ def test_get_package_releases_yields_in_descending_order(sample_pypi_response: d
     """Releases should be yielded newest first."""
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = sample_pypi_response
+    mock_response.content = orjson.dumps(sample_pypi_response)
 
     mock_client = MagicMock()
     mock_client.get.return_value = mock_response
@@ -91,7 +92,7 @@ def test_get_package_releases_extracts_wheel_info(sample_pypi_response: dict):
     """Wheel info should be extracted correctly."""
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = sample_pypi_response
+    mock_response.content = orjson.dumps(sample_pypi_response)
 
     mock_client = MagicMock()
     mock_client.get.return_value = mock_response
@@ -110,7 +111,7 @@ def test_get_package_releases_skips_without_wheels(sample_pypi_response: dict):
     """Releases without wheel files should be skipped."""
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = sample_pypi_response
+    mock_response.content = orjson.dumps(sample_pypi_response)
 
     mock_client = MagicMock()
     mock_client.get.return_value = mock_response
@@ -126,7 +127,7 @@ def test_get_package_releases_detects_yanked(sample_pypi_response: dict):
     """Yanked releases should be marked as such."""
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = sample_pypi_response
+    mock_response.content = orjson.dumps(sample_pypi_response)
 
     mock_client = MagicMock()
     mock_client.get.return_value = mock_response
@@ -158,7 +159,7 @@ def test_get_matching_versions_filters_by_constraint(sample_pypi_response: dict)
     """Should only yield versions matching the constraint."""
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = sample_pypi_response
+    mock_response.content = orjson.dumps(sample_pypi_response)
 
     mock_client = MagicMock()
     mock_client.get.return_value = mock_response
@@ -175,7 +176,7 @@ def test_get_matching_versions_excludes_yanked_by_default(sample_pypi_response:
     """Yanked releases should be excluded by default."""
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = sample_pypi_response
+    mock_response.content = orjson.dumps(sample_pypi_response)
 
     mock_client = MagicMock()
     mock_client.get.return_value = mock_response
@@ -191,7 +192,7 @@ def test_get_matching_versions_includes_yanked_when_requested(sample_pypi_respon
     """Yanked releases should be included when requested."""
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = sample_pypi_response
+    mock_response.content = orjson.dumps(sample_pypi_response)
 
     mock_client = MagicMock()
     mock_client.get.return_value = mock_response
@@ -209,7 +210,7 @@ def test_get_matching_versions_respects_max_versions(sample_pypi_response: dict)
     """Should limit results to max_versions."""
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = sample_pypi_response
+    mock_response.content = orjson.dumps(sample_pypi_response)
 
     mock_client = MagicMock()
     mock_client.get.return_value = mock_response
@@ -277,11 +278,16 @@ def test_download_wheel_streams_bytes():
         test_content[i : i + 100] for i in range(0, len(test_content), 100)
     ]
 
-    with patch("cart_wheel.pypi.httpx.Client") as mock_client:
-        mock_client.return_value.__enter__.return_value.stream.return_value.__enter__.return_value = (
-            mock_response
-        )
+    with patch("cart_wheel.pypi.get_download_client") as mock_client:
+        mock_client.return_value.stream.return_value.__enter__.return_value = mock_response
 
         chunks = list(download_wheel("https://example.com/wheel.whl"))
 
     assert b"".join(chunks) == test_content
+
+
+def test_get_download_client_is_shared():
+    """Should hand out one keep-alive client for all downloads."""
+    from cart_wheel.http import get_download_client
+
+    assert get_download_client() is get_download_client()
@@ -5,6 +5,7 @@ from __future__ import annotations
 from datetime import datetime
 from pathlib import Path
 
+import orjson
 import pytest
 
 from cart_wheel.state import (
@@ -17,6 +18,7 @@ from cart_wheel.state import (
     list_packages,
     load_package_config,
     load_state,
+    load_status_counts,
     save_state,
     validate_dependencies,
 )
@@ -207,6 +209,84 @@ def test_save_state_creates_directory(tmp_path: Path):
     assert (state_dir / "pkg.json").exists()
 
 
+def test_load_status_counts(tmp_path: Path):
+    """Should count wheels by status and refresh counts when state changes."""
+    state_dir = tmp_path / "state"
+    cache_dir = tmp_path / "cache"
+    save_state(
+        state_dir,
+        "pkg",
+        {
+            "a.whl": WheelState(status="converted"),
+            "b.whl": WheelState(status="pending"),
+            "c.whl": WheelState(status="pending"),
+        },
+    )
+
+    counts = load_status_counts(state_dir, ["pkg", "missing"], cache_dir=cache_dir)
+    assert counts == {"pkg": {"converted": 1, "pending": 2}, "missing": {}}
+    assert len(list(cache_dir.iterdir())) == 1
+    assert sorted(p.name for p in state_dir.iterdir()) == ["pkg.json"]
+
+    save_state(state_dir, "pkg", {"a.whl": WheelState(status="failed")})
+
+    counts = load_status_counts(state_dir, ["pkg"], cache_dir=cache_dir)
+    assert counts == {"pkg": {"failed": 1}}
+
+
+def test_load_status_counts_without_cache(tmp_path: Path):
+    """Should count wheels without writing anything when no cache dir is given."""
+    state_dir = tmp_path / "state"
+    save_state(state_dir, "pkg", {"a.whl": WheelState(status="converted")})
+
+    assert load_status_counts(state_dir, ["pkg"]) == {"pkg": {"converted": 1}}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["state"]
+    assert sorted(p.name for p in state_dir.iterdir()) == ["pkg.json"]
+
+
+def test_load_status_counts_unwritable_cache(tmp_path: Path, monkeypatch):
+    """Should still return counts when the cache cannot be written."""
+    state_dir = tmp_path / "state"
+    cache_dir = tmp_path / "cache"
+    save_state(state_dir, "pkg", {"a.whl": WheelState(status="converted")})
+
+    def read_only_replace(self, target):
+        raise PermissionError(target)
+
+    monkeypatch.setattr(Path, "replace", read_only_replace)
+
+    counts = load_status_counts(state_dir, ["pkg"], cache_dir=cache_dir)
+    assert counts == {"pkg": {"converted": 1}}
+    assert list(cache_dir.iterdir()) == []
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        None,
+        [],
+        {"counts": {"stale": 5}},
+        {"key": "KEY"},
+        {"key": "KEY", "counts": ["stale"]},
+        {"key": "KEY", "counts": {"stale": "5"}},
+    ],
+)
+def test_load_status_counts_malformed_cache_entry(tmp_path: Path, entry):
+    """Should treat malformed cache entries as misses."""
+    state_dir = tmp_path / "state"
+    cache_dir = tmp_path / "cache"
+    save_state(state_dir, "pkg", {"a.whl": WheelState(status="converted")})
+    load_status_counts(state_dir, ["pkg"], cache_dir=cache_dir)
+    (cache_path,) = cache_dir.iterdir()
+    key = orjson.loads(cache_path.read_bytes())["pkg"]["key"]
+    if isinstance(entry, dict) and entry.get("key") == "KEY":
+        entry = {**entry, "key": key}
+    cache_path.write_bytes(orjson.dumps({"pkg": entry}))
+
+    counts = load_status_counts(state_dir, ["pkg"], cache_dir=cache_dir)
+    assert counts == {"pkg": {"converted": 1}}
+
+
 def test_validate_dependencies_all_found():
     """Should return empty list when all deps found."""
     deps = Dependencies(required=["requests", "numpy"])